@@ -1 +1,15 @@
-from .video_feedback_agent import VideoFeedbackAgent
\ No newline at end of file
+from .context_cache import ChatContextCache
+
+
+def __getattr__(name):
+    # LangChain is only imported once the agent or its history is actually needed
+    if name == "VideoFeedbackAgent":
+        from .video_feedback_agent import VideoFeedbackAgent
+        return VideoFeedbackAgent
+    if name in ("SQLiteChatMessageHistory", "purge_expired_chat_history"):
+        from . import chat_history
+        return getattr(chat_history, name)
+    if name in ("index_video", "retrieve_snippets", "embedding_index"):
+        from . import retrieval
+        return getattr(retrieval, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
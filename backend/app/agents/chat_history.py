@@ -0,0 +1,152 @@
+import textwrap
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from ..ai_models.tokenizer import count_tokens
+from ..sql_app import async_crud, crud
+from ..sql_app.async_database import AsyncSessionLocal
+from ..sql_app.database import SessionLocal
+
+MESSAGE_TYPES = {"human": HumanMessage, "ai": AIMessage, "system": SystemMessage}
+
+Summarizer = Callable[[str, List[BaseMessage]], str]
+
+
+def compact_turns(summary: str, messages: List[BaseMessage], max_tokens: int = 500, max_chars_per_turn: int = 240) -> str:
+    """
+    Extractive running summary: older turns are shortened to one line each and
+    appended to the previous summary, keeping only the most recent lines that fit
+    in `max_tokens`. Needs no LLM call, so compaction adds no latency to a turn.
+    """
+    lines = [line for line in summary.splitlines() if line]
+    for message in messages:
+        speaker = "Human" if message.type == "human" else "AI"
+        content = " ".join(str(message.content).split())
+        lines.append(f"{speaker}: {textwrap.shorten(content, max_chars_per_turn, placeholder='...')}")
+
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history persisted in the `chat_messages`/`chat_summaries` tables.
+
+    Recent turns are returned verbatim as long as they fit in `token_budget`.
+    When a new turn pushes the session over budget, the oldest turns are folded
+    into a running summary (returned as a leading system message) until the
+    verbatim window is down to half the budget, so prompt size stays bounded.
+
+    The async methods, used by the streaming chat, go through `async_crud`.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        token_budget: int = 2000,
+        summary_tokens: int = 500,
+        summarizer: Optional[Summarizer] = None,
+        session_factory=SessionLocal,
+        async_session_factory=AsyncSessionLocal,
+    ):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or (lambda summary, messages: compact_turns(summary, messages, summary_tokens))
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+
+    @staticmethod
+    def _to_message(row) -> BaseMessage:
+        return MESSAGE_TYPES.get(row.role, HumanMessage)(content=row.content)
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        db = self.session_factory()
+        try:
+            summary = crud.get_chat_summary(db, self.session_id)
+            rows = crud.get_chat_messages(db, self.session_id, after_id=summary.summarized_through if summary else 0)
+        finally:
+            db.close()
+        return self._window(summary, rows)
+
+    async def aget_messages(self) -> List[BaseMessage]:
+        async with self.async_session_factory() as db:
+            summary = await async_crud.get_chat_summary(db, self.session_id)
+            rows = await async_crud.get_chat_messages(db, self.session_id, after_id=summary.summarized_through if summary else 0)
+        return self._window(summary, rows)
+
+    def _window(self, summary, rows) -> List[BaseMessage]:
+        # Most recent turns that fit in the budget, in chronological order
+        window, used = [], 0
+        for row in reversed(rows):
+            used += count_tokens(row.content)
+            if window and used > self.token_budget:
+                break
+            window.append(self._to_message(row))
+        window.reverse()
+
+        if summary and summary.summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary.summary}")] + window
+        return window
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        db = self.session_factory()
+        try:
+            crud.create_chat_messages(db, self.session_id, [(message.type, str(message.content)) for message in messages])
+            self._compact(db)
+        finally:
+            db.close()
+
+    async def aadd_messages(self, messages: Sequence[BaseMessage]) -> None:
+        async with self.async_session_factory() as db:
+            await async_crud.create_chat_messages(db, self.session_id, [(message.type, str(message.content)) for message in messages])
+            summary = await async_crud.get_chat_summary(db, self.session_id)
+            rows = await async_crud.get_chat_messages(db, self.session_id, after_id=summary.summarized_through if summary else 0)
+            folded = self._fold(summary, rows)
+            if folded:
+                await async_crud.upsert_chat_summary(db, self.session_id, *folded)
+
+    def _compact(self, db):
+        summary = crud.get_chat_summary(db, self.session_id)
+        rows = crud.get_chat_messages(db, self.session_id, after_id=summary.summarized_through if summary else 0)
+        folded = self._fold(summary, rows)
+        if folded:
+            crud.upsert_chat_summary(db, self.session_id, *folded)
+
+    def _fold(self, summary, rows) -> Optional[Tuple[str, int]]:
+        """The new (summary, summarized_through) when `rows` are over budget, else None."""
+        tokens = [count_tokens(row.content) for row in rows]
+        if sum(tokens) <= self.token_budget:
+            return None
+
+        # Keep the newest turns verbatim within half the budget, fold the rest
+        kept, split = 0, len(rows)
+        while split > 1 and kept + tokens[split - 1] <= self.token_budget // 2:
+            split -= 1
+            kept += tokens[split]
+        folded = rows[:split]
+
+        new_summary = self.summarizer(summary.summary if summary else "", [self._to_message(row) for row in folded])
+        return new_summary, folded[-1].id
+
+    def clear(self) -> None:
+        db = self.session_factory()
+        try:
+            crud.delete_chat_session(db, self.session_id)
+        finally:
+            db.close()
+
+    async def aclear(self) -> None:
+        async with self.async_session_factory() as db:
+            await async_crud.delete_chat_session(db, self.session_id)
+
+
+async def purge_expired_chat_history(ttl: timedelta, session_factory=AsyncSessionLocal) -> int:
+    """Delete every chat session idle for longer than `ttl`, returns how many were removed."""
+    async with session_factory() as db:
+        return await async_crud.delete_chat_sessions_before(db, datetime.utcnow() - ttl)
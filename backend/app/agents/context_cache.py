@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class ChatContextCache:
+    """
+    LRU cache of the rendered chat context block for each video.
+
+    Entries are keyed by video id and tagged with the video's `content_version`,
+    which every write through `crud.create_video_comment` bumps. A lookup with a
+    newer version is a miss, so a stale context is never served even when the
+    write happened in another process. In-process writes also evict the entry
+    directly through `invalidate`.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, video_id: int, version: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(video_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, video_id: int, version: int, context: dict):
+        with self._lock:
+            self._entries[video_id] = (version, context)
+            self._entries.move_to_end(video_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, video_id: int):
+        with self._lock:
+            if self._entries.pop(video_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,56 @@
+import json
+import os
+from typing import Callable, List
+
+from ..ai_models.embeddingIndex import get_embedding_index
+from ..sql_app import crud
+from ..sql_app.database import SessionLocal, db_path
+
+# Raw comments indexed per video, most liked first
+EMBEDDING_MAX_COMMENTS = int(os.getenv("EMBEDDING_MAX_COMMENTS", 500))
+# Next to the database it mirrors, so a new video.db also starts a new index
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", f"{os.path.splitext(db_path)[0]}_embeddings")
+
+
+def embedding_index():
+    return get_embedding_index(EMBEDDING_INDEX_DIR)
+
+
+def render_category(comment) -> str:
+    return (
+        f"Category: {comment.comment_category}\n"
+        f"Category Count: {comment.category_count}\n"
+        f"Summary: {comment.summary}\n"
+        f"Insights: {json.loads(comment.comment_insights)}\n"
+        f"Representative Comments: {json.loads(comment.representative_comments)}"
+    )
+
+
+def render_raw_comment(comment) -> str:
+    return f"Viewer comment ({comment.likes} likes): {comment.text}"
+
+
+def index_video(video_id: int, session_factory: Callable = SessionLocal):
+    """Bring the video's entries in the embedding index up to its current content version."""
+    db = session_factory()
+    try:
+        video = crud.get_video(db, video_id=video_id)
+        if video is None:
+            return
+        items = [("category", comment.id, render_category(comment)) for comment in crud.get_comments_by_video_id(db, video_id)]
+        items += [
+            ("comment", comment.id, render_raw_comment(comment))
+            for comment in crud.get_top_raw_comments(db, video_id, limit=EMBEDDING_MAX_COMMENTS)
+        ]
+        embedding_index().sync_video(video_id, video.content_version or 0, items)
+    finally:
+        db.close()
+
+
+def retrieve_snippets(video_id: int, version: int, question: str, k: int = 20) -> List[str]:
+    """Stored categories and comments of the video most similar to the question, best first."""
+    index = embedding_index()
+    # Catches writes made outside this process, whose listeners never ran here
+    if index.version(video_id) != version:
+        index_video(video_id)
+    return [text for _, _, _, text in index.search(video_id, question, k=k)]
@@ -1,16 +1,20 @@
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.messages import get_buffer_string
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.output_parsers import StrOutputParser
-from langchain.schema.runnable import RunnablePassthrough
+from langchain_core.runnables import RunnablePassthrough
 from dotenv import load_dotenv
 import os
-import json
+
+from ..ai_models.tokenizer import count_tokens
+
+from .chat_history import SQLiteChatMessageHistory
+from .retrieval import render_category
+from ..observability.llm import TokenUsageCallback
 
 class VideoFeedbackAgent:
-    def __init__(self):
+    def __init__(self, model=None):
         load_dotenv()
         os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
@@ -29,67 +33,108 @@ class VideoFeedbackAgent:
             Comments Summary:
             {comments_summary}
 
+            You have all the necessary information about the video, including its URL, title, and summary. Do not ask for the URL as it's already provided in the video summary.
+
+            Make sure to only answer questions related or relevant to the video based on the information provided.
+            Do not provide any opinions or feedback that are not supported by the data.
+            Politely decline if the question is not related to the video.
+            If the user initiates small talk, politely redirect the conversation back to the video.
+            Do not thank the user for providing the video information or comments summary as it is provided for your reference by the system.
+
             Chat History:
             {chat_history}
 
-            You have all the necessary information about the video, including its URL, title, and summary. Do not ask for the URL as it's already provided in the video summary.
-
             Human: {input}
             AI: Let's approach this step-by-step:
             """
         )
 
-        llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=0)
+        llm = model if model is not None else ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=0)
 
-        chain = prompt_template | llm | StrOutputParser()
+        # History arrives as messages, render it as a transcript for the text prompt
+        chain = (
+            RunnablePassthrough.assign(chat_history=lambda x: get_buffer_string(x["chat_history"]))
+            | prompt_template
+            | llm.with_config(callbacks=[TokenUsageCallback("feedback_agent")])
+            | StrOutputParser()
+        )
+
+        # Persisted per session id, older turns are compacted to stay within the token budget
+        history_token_budget = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 2000))
+        history_summary_tokens = int(os.getenv("CHAT_HISTORY_SUMMARY_TOKENS", 500))
 
         self.agent_with_chat_history = RunnableWithMessageHistory(
             chain,
-            lambda session_id: ChatMessageHistory(session_id=session_id),
+            lambda session_id: SQLiteChatMessageHistory(
+                session_id,
+                token_budget=history_token_budget,
+                summary_tokens=history_summary_tokens,
+            ),
             input_messages_key="input",
             history_messages_key="chat_history",
         )
 
-    def generate_feedback(self, video, comments, user_input, session_id, url):
-        video_summary = f"Title: {video.title}\nURL: {url}"
+    def render_context(self, video, comments):
+        """Context block for a video, cacheable until its comments or summary change."""
+        video_summary = f"Title: {video.title}\nURL: {video.url}"
+        if video.summary:
+            # What the video shows, filled in by the video summarizer after the first summarize
+            video_summary += f"\nContent: {video.summary}"
         
-        comments_summary = "\n\n".join([
-            f"Category: {comment.comment_category}\n"
-            f"Category Count: {comment.category_count}\n"
-            f"Summary: {comment.summary}\n"
-            f"Insights: {json.loads(comment.comment_insights)}\n"
-            f"Representative Comments: {json.loads(comment.representative_comments)}"
-            for comment in comments
-        ])
-
-        full_input = f"""
-        Video Information:
-        {video_summary}
-
-        Comments Summary:
-        {comments_summary}
-
-        Based on the above information about the video and its comments, please answer the following question:
-        {user_input}
-
-        Make sure to only answer questions related or relevant to the video based on the information provided.
-        Do not provide any opinions or feedback that are not supported by the data.
-        Politely decline if the question is not related to the video.
-        If the user initiates small talk, politely redirect the conversation back to the video.
-        Do not thank the user for providing the video information or comments summary as it is provided for your reference by the system.
-        """
+        comments_summary = "\n\n".join([render_category(comment) for comment in comments])
 
+        return {
+            "video_summary": video_summary,
+            "comments_summary": comments_summary
+        }
+
+    def render_snippets(self, context, snippets, token_budget):
+        """
+        `context` with its comments summary replaced by the retrieved snippets,
+        most relevant first, as many as fit in `token_budget`.
+        """
+        selected = []
+        used = 0
+        for snippet in snippets:
+            tokens = count_tokens(snippet)
+            if used + tokens > token_budget:
+                continue
+            selected.append(snippet)
+            used += tokens
+
+        return {**context, "comments_summary": "\n\n".join(selected)}
+
+    def _build_inputs(self, context, user_input):
+        # Only the question goes into the history, the video context is passed
+        # fresh on every turn instead of being re-stored with each message
+        return {**context, "input": user_input}
+
+    def generate_feedback(self, context, user_input, session_id):
         response = self.agent_with_chat_history.invoke(
-            {
-                "video_summary": video_summary,
-                "comments_summary": comments_summary,
-                "input": full_input
-            },
+            self._build_inputs(context, user_input),
             config={"configurable": {"session_id": session_id}}
         )          
 
         print(response)
         return response 
+
+    async def agenerate_feedback(self, context, user_input, session_id):
+        response = await self.agent_with_chat_history.ainvoke(
+            self._build_inputs(context, user_input),
+            config={"configurable": {"session_id": session_id}}
+        )
+        return response
+
+    async def astream_feedback(self, context, user_input, session_id):
+        """
+        Yields the response as Gemini generates it. The chat history is only
+        written once the stream completes, an aborted stream leaves no partial turn.
+        """
+        async for chunk in self.agent_with_chat_history.astream(
+            self._build_inputs(context, user_input),
+            config={"configurable": {"session_id": session_id}}
+        ):
+            yield chunk
     
     def _get_default_output_parser(self):
         return StrOutputParser()
@@ -1 +1,10 @@
-from .commentSummarizer import CommentSummary
+from .commentSummarizer import get_summary_cache
+from .registry import model_registry, get_comment_summary, get_feedback_agent
+
+
+def __getattr__(name):
+    # LangChain is only imported once a model class is actually needed
+    if name == "CommentSummary":
+        from .commentSummarizer.commentSummary import CommentSummary
+        return CommentSummary
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
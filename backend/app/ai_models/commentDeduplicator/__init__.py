@@ -0,0 +1 @@
+from .commentDedup import collapse_near_duplicates, minhash_signatures
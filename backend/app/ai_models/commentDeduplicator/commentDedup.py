@@ -0,0 +1,182 @@
+import re
+from typing import List, Tuple
+
+import numpy as np
+
+# MinHash permutations use multiply-shift hashing, (a * x + b) >> 32 over 32-bit
+# shingle hashes, which needs no modulo and wraps safely in uint64
+_BASE = np.uint64(1_000_003)
+_LOW_32 = np.uint64(0xFFFFFFFF)
+_SHIFT = np.uint64(32)
+
+_WHITESPACE = re.compile(r"\s+")
+_REPEATS = re.compile(r"(.)\1{3,}")
+
+# Upper bound on shingles hashed at once, keeps the (shingles x permutations) block small
+_BLOCK_SHINGLES = 50_000
+
+
+def normalize_text(text: str) -> str:
+    text = _WHITESPACE.sub(" ", str(text)).strip().casefold()
+    # "sooooo" and "sooo" should look alike, keep at most 3 repeats of a character
+    return _REPEATS.sub(r"\1\1\1", text)
+
+
+def _shingle_hashes(texts: List[str], ngram: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash every character n-gram of every text in one vectorized pass.
+
+    Returns the 32-bit shingle hashes, grouped by text, and the offset of each
+    text's first shingle. Texts shorter than `ngram` are padded to one shingle.
+    """
+    texts = [text.ljust(ngram) for text in texts]
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    total = len(codes)
+    padded = np.concatenate((codes, np.zeros(ngram, dtype=np.uint64)))
+    hashes = np.zeros(total, dtype=np.uint64)
+    for offset in range(ngram):
+        # Polynomial rolling hash, uint64 arithmetic wraps around on overflow
+        hashes = hashes * _BASE + padded[offset:offset + total]
+
+    # Keep only the n-grams that start and end inside the same text
+    position = np.arange(total) - np.repeat(starts, lengths)
+    valid = position <= np.repeat(lengths - ngram, lengths)
+
+    shingle_counts = lengths - ngram + 1
+    offsets = np.concatenate(([0], np.cumsum(shingle_counts)[:-1]))
+    return hashes[valid] & _LOW_32, offsets
+
+
+def minhash_signatures(texts: List[str], num_perm: int = 64, ngram: int = 3, seed: int = 1) -> np.ndarray:
+    """MinHash signature of each text's character n-gram set, shape (len(texts), num_perm)."""
+    if not texts:
+        return np.zeros((0, num_perm), dtype=np.uint32)
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    shingles, offsets = _shingle_hashes(texts, ngram)
+    ends = np.append(offsets[1:], len(shingles))
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+
+    first = 0
+    while first < len(texts):
+        # Grow the block of texts until it holds roughly _BLOCK_SHINGLES shingles
+        last = int(np.searchsorted(ends, offsets[first] + _BLOCK_SHINGLES, side="right"))
+        last = max(last, first + 1)
+        block = shingles[offsets[first]:ends[last - 1]]
+        permuted = ((block[:, None] * a[None, :] + b[None, :]) >> _SHIFT).astype(np.uint32)
+        signatures[first:last] = np.minimum.reduceat(permuted, offsets[first:last] - offsets[first], axis=0)
+        first = last
+
+    return signatures
+
+
+def _connected_components(size: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Label every node with the smallest index in its component (min-label propagation)."""
+    labels = np.arange(size)
+    if len(left) == 0:
+        return labels
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, left, labels[right])
+        np.minimum.at(labels, right, labels[left])
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def _similar_pairs(signatures: np.ndarray, bands: int, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Candidate pairs from LSH banding, kept when their estimated Jaccard similarity passes the threshold."""
+    rows = signatures.shape[1] // bands
+    rng = np.random.default_rng(0)
+    multipliers = rng.integers(1, 1 << 62, size=rows, dtype=np.uint64)
+    index = np.arange(len(signatures))
+
+    left, right = [], []
+    for band in range(bands):
+        keys = (signatures[:, band * rows:(band + 1) * rows].astype(np.uint64) * multipliers).sum(axis=1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        # Pair every bucket member with the first member of its bucket
+        new_bucket = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        bucket_start = np.maximum.accumulate(np.where(new_bucket, index, 0))
+        members = order[~new_bucket]
+        heads = order[bucket_start[~new_bucket]]
+        if len(members) == 0:
+            continue
+
+        similarity = (signatures[heads] == signatures[members]).mean(axis=1)
+        keep = similarity >= threshold
+        left.append(heads[keep])
+        right.append(members[keep])
+
+    if not left:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+
+def collapse_near_duplicates(
+    comments: List[dict],
+    threshold: float = 0.7,
+    num_perm: int = 64,
+    bands: int = 16,
+    ngram: int = 3,
+) -> List[dict]:
+    """
+    Collapse near-duplicate comments into one entry carrying a multiplicity count.
+
+    Exact duplicates (after normalizing case, whitespace and repeated characters)
+    are merged first. The remaining texts are compared with MinHash over character
+    n-grams and LSH banding, and comments whose estimated Jaccard similarity is at
+    least `threshold` are merged. Each group is represented by its most liked
+    comment with `likes` summed over the group and `count` set to the group size
+    when it is larger than one. Results are ordered by likes, descending.
+    """
+    if not comments:
+        return []
+
+    # Exact duplicates first, a dict lookup is cheaper than hashing shingles
+    unique_index = {}
+    group_of = np.empty(len(comments), dtype=np.int64)
+    texts = []
+    for i, comment in enumerate(comments):
+        text = normalize_text(comment.get("text", ""))
+        if text not in unique_index:
+            unique_index[text] = len(texts)
+            texts.append(text)
+        group_of[i] = unique_index[text]
+
+    signatures = minhash_signatures(texts, num_perm=num_perm, ngram=ngram)
+    left, right = _similar_pairs(signatures, bands, threshold)
+    labels = _connected_components(len(texts), left, right)[group_of]
+
+    likes = np.fromiter((comment.get("likes", 0) or 0 for comment in comments), dtype=np.int64, count=len(comments))
+    multiplicity = np.fromiter((comment.get("count", 1) for comment in comments), dtype=np.int64, count=len(comments))
+
+    total_likes = np.bincount(labels, weights=likes, minlength=len(texts)).astype(np.int64)
+    total_count = np.bincount(labels, weights=multiplicity, minlength=len(texts)).astype(np.int64)
+
+    # Representative of each group is its most liked comment
+    order = np.lexsort((-likes, labels))
+    first_of_group = np.concatenate(([True], labels[order][1:] != labels[order][:-1]))
+    representatives = order[first_of_group]
+
+    collapsed = []
+    for i in representatives:
+        label = labels[i]
+        comment = dict(comments[i])
+        comment["likes"] = int(total_likes[label])
+        if total_count[label] > 1:
+            comment["count"] = int(total_count[label])
+        else:
+            comment.pop("count", None)
+        collapsed.append(comment)
+
+    collapsed.sort(key=lambda comment: comment["likes"], reverse=True)
+    return collapsed
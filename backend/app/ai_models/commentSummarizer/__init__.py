@@ -1 +1,9 @@
-from .commentSummary import CommentSummary, PromptResponse
+from .summaryCache import SummaryCache, get_summary_cache
+
+
+def __getattr__(name):
+    # LangChain is only imported once a model class is actually needed
+    if name in ("CommentSummary", "PromptResponse"):
+        from . import commentSummary
+        return getattr(commentSummary, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,20 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 
-from langchain_groq import ChatGroq
 from langchain_google_genai import ChatGoogleGenerativeAI
 
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.pydantic_v1 import BaseModel, Field
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
+
+from .summaryCache import SummaryCache, get_summary_cache, summary_cache_key
+from .mapReduce import chunk_comments, merge_comment_categories
+from .promptPacking import PackedComments, encode_comment, pack_comments, rank_comments
+from ..tokenizer import count_tokens_batch
+from ...observability.llm import TokenUsageCallback, timed_runnable
+from ...observability.metrics import record_comments, span
 
 class CommentCategory(BaseModel):
     summary: str = Field(description="A brief overview of the main points in this category")
@@ -19,14 +26,49 @@ class CommentCategories(BaseModel):
     categories: Dict[str, CommentCategory] = Field(description="A dictionary of categories, each containing summary, comment counts, insights and representative comments")
 
 class CommentSummary:
-    def __init__(self):
+    """
+    Categorizes comments with Gemini.
+
+    Comments are packed into the prompt one line each, see `promptPacking`.
+    mode="single" sends the most liked comments that fit in `chunk_tokens` in
+    one prompt. mode="map_reduce" splits the comments into chunks of at most
+    `chunk_tokens`, categorizes the chunks in parallel (up to `max_concurrency`
+    at once) and merges the results. mode="auto" only uses map-reduce when the
+    comments do not fit in one chunk.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[SummaryCache] = None,
+        mode: str = os.getenv("SUMMARY_MODE", "auto"),
+        chunk_tokens: int = int(os.getenv("SUMMARY_CHUNK_TOKENS", 16000)),
+        max_concurrency: int = int(os.getenv("SUMMARY_MAX_CONCURRENCY", 4)),
+        max_comment_chars: int = int(os.getenv("SUMMARY_MAX_COMMENT_CHARS", 500)),
+        model=None,
+    ):
         # Load the environment variables
         load_dotenv()
         os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
         os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
-        # self.model = ChatGroq(model="llama3-8b-8192", temperature=0)
-        self.model = ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=0)
+        # self.model = ChatGroq(model="llama3-8b-8192", temperature=0)  # from langchain_groq import ChatGroq
+        # `model` swaps in another chat model, e.g. the benchmarks' stand-in
+        if model is None:
+            self.model_name = "gemini-1.5-pro"
+            self.model = ChatGoogleGenerativeAI(model=self.model_name, temperature=0)
+        else:
+            self.model_name = getattr(model, "model_name", type(model).__name__)
+            self.model = model
+
+        # Results are cached by content, identical comment sets skip the LLM call
+        self.cache = cache if cache is not None else get_summary_cache()
+
+        if mode not in ("single", "map_reduce", "auto"):
+            raise ValueError(f"Unknown summary mode: {mode}")
+        self.mode = mode
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.max_comment_chars = max_comment_chars
 
         self.parser = JsonOutputParser(pydantic_object=CommentCategories)
         
@@ -64,6 +106,8 @@ Additional Instructions:
 - Highlight any emerging trends or patterns in the comments.
 - If there are conflicting viewpoints, present both sides objectively.
 - Note the relative prevalence of different types of comments if significant.
+- A comment marked xN stands for N near-identical comments. Weigh it accordingly and add N, not 1, to the Category Count.
+- Comments with more likes speak for more viewers.
 
 {format_instructions}
 
@@ -75,12 +119,123 @@ COMMENTS:
 <|eot_id|>
 <|start_header_id|>assistant<|end_header_id|>""", input_variables=["format_instructions", "comments"], partial_variables={"format_instructions": self.parser.get_format_instructions()})
 
-        # Generator
-        self.generator = self.prompt | self.model | self.parser
+        # Generator, recording token counts and the time spent parsing the JSON answer
+        self.generator = (
+            self.prompt
+            | self.model.with_config(callbacks=[TokenUsageCallback("comment_summary")])
+            | timed_runnable("comment_summary_parse", self.parser)
+        )
+        # Same chain for streaming, the parser yields the JSON parsed so far on every chunk
+        self.stream_generator = (
+            self.prompt
+            | self.model.with_config(callbacks=[TokenUsageCallback("comment_summary")])
+            | self.parser
+        )
+
+    def _cache_key(self, packed: PackedComments) -> str:
+        return summary_cache_key([packed.text], self.prompt.template, self.model_name)
+
+    def _pack(self, chunks) -> List[PackedComments]:
+        with span("comment_packing", chunks=len(chunks)) as fields:
+            packs = [pack_comments(chunk, self.chunk_tokens, self.max_comment_chars) for chunk in chunks]
+            fields["tokens"] = sum(packed.tokens for packed in packs)
+        record_comments("packed", sum(packed.included for packed in packs))
+        record_comments("over_budget", sum(packed.dropped for packed in packs))
+        return packs
+
+    def prepare(self, comments) -> List[PackedComments]:
+        """
+        The prompts for `comments`, one per map-reduce chunk or a single one.
+        Tokenizes every comment, so async callers run it in a thread.
+        """
+        ranked = rank_comments(comments)
+        costs = count_tokens_batch([encode_comment(comment, self.max_comment_chars) for comment in ranked])
+        if self.mode == "single" or (self.mode == "auto" and sum(costs) <= self.chunk_tokens):
+            return self._pack([ranked])
+        chunks = chunk_comments(list(range(len(ranked))), self.chunk_tokens, cost=costs.__getitem__)
+        return self._pack([[ranked[i] for i in chunk] for chunk in chunks])
+
+    def _use_map_reduce(self, packs: List[PackedComments]) -> bool:
+        return self.mode == "map_reduce" or len(packs) > 1
 
     def get_comments_summary(self, comments) -> CommentCategories:
-        results: CommentCategories = self.generator.invoke({"comments": comments})
+        return self.summarize_packed(self.prepare(comments))
+
+    async def aget_comments_summary(self, comments) -> CommentCategories:
+        return await self.asummarize_packed(await asyncio.to_thread(self.prepare, comments))
+
+    async def astream_comments_summary(self, comments) -> AsyncIterator[CommentCategories]:
+        async for results in self.astream_packed(await asyncio.to_thread(self.prepare, comments)):
+            yield results
+
+    def summarize_packed(self, packs: List[PackedComments]) -> CommentCategories:
+        if self._use_map_reduce(packs):
+            return self._map_reduce(packs)
+        key = self._cache_key(packs[0])
+        results = self.cache.get(key)
+        if results is None:
+            results: CommentCategories = self.generator.invoke({"comments": packs[0].text})
+            self.cache.put(key, results)
+        return results
+
+    async def asummarize_packed(self, packs: List[PackedComments]) -> CommentCategories:
+        if self._use_map_reduce(packs):
+            return await self._amap_reduce(packs)
+        key = self._cache_key(packs[0])
+        results = await self.cache.aget(key)
+        if results is None:
+            results: CommentCategories = await self.generator.ainvoke({"comments": packs[0].text})
+            await self.cache.aput(key, results)
         return results
+
+    async def astream_packed(self, packs: List[PackedComments]) -> AsyncIterator[CommentCategories]:
+        """
+        Partial CommentCategories while the model is still generating, the last
+        one yielded is the final result. Cache hits and map-reduce summaries are
+        yielded once, complete.
+        """
+        if self._use_map_reduce(packs):
+            yield await self._amap_reduce(packs)
+            return
+
+        key = self._cache_key(packs[0])
+        results = await self.cache.aget(key)
+        if results is not None:
+            yield results
+            return
+
+        async for results in self.stream_generator.astream({"comments": packs[0].text}):
+            yield results
+        if results is not None:
+            await self.cache.aput(key, results)
+
+    def _map_reduce(self, packs: List[PackedComments]) -> CommentCategories:
+        keys = [self._cache_key(packed) for packed in packs]
+        results = [self.cache.get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            mapped = self.generator.batch(
+                [{"comments": packs[i].text} for i in pending],
+                config={"max_concurrency": self.max_concurrency},
+            )
+            self.cache.put_many([(keys[i], result) for i, result in zip(pending, mapped)])
+            for i, result in zip(pending, mapped):
+                results[i] = result
+        return merge_comment_categories(results)
+
+    async def _amap_reduce(self, packs: List[PackedComments]) -> CommentCategories:
+        keys = [self._cache_key(packed) for packed in packs]
+        results = await self.cache.aget_many(keys)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            mapped = await self.generator.abatch(
+                [{"comments": packs[i].text} for i in pending],
+                config={"max_concurrency": self.max_concurrency},
+            )
+            await self.cache.aput_many([(keys[i], result) for i, result in zip(pending, mapped)])
+            for i, result in zip(pending, mapped):
+                results[i] = result
+        return merge_comment_categories(results)
     
 class PromptOutput(BaseModel):
     response: str = Field(description="Response to the prompt by the user")
@@ -91,7 +246,7 @@ class PromptResponse:
         load_dotenv()
         os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
 
-        # self.model = ChatGroq(model="llama3-8b-8192", temperature=0)
+        # self.model = ChatGroq(model="llama3-8b-8192", temperature=0)  # from langchain_groq import ChatGroq
         self.model = ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=0)
 
         self.parser = JsonOutputParser(pydantic_object=PromptOutput)
@@ -0,0 +1,76 @@
+from typing import Callable, Dict, List
+
+from ..tokenizer import count_tokens
+
+
+def chunk_comments(comments: list, token_budget: int, cost: Callable[[object], int] = count_tokens) -> List[list]:
+    """Split comments, in order, into chunks whose token count by `cost` fits the budget."""
+    chunks: List[list] = []
+    chunk: list = []
+    chunk_tokens = 0
+
+    for comment in comments:
+        tokens = cost(comment)
+        if chunk and chunk_tokens + tokens > token_budget:
+            chunks.append(chunk)
+            chunk, chunk_tokens = [], 0
+        chunk.append(comment)
+        chunk_tokens += tokens
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _dedupe(items: list, limit: int) -> list:
+    seen = set()
+    unique = []
+    for item in items:
+        marker = item.strip().casefold() if isinstance(item, str) else item
+        if item and marker not in seen:
+            seen.add(marker)
+            unique.append(item)
+    return unique[:limit]
+
+
+def merge_comment_categories(results: List[dict], max_insights: int = 5, max_representative: int = 3) -> dict:
+    """
+    Reduce per-chunk CommentCategories into one.
+
+    Categories are matched by case-insensitive name. Counts are summed, insights
+    and representative comments are concatenated without duplicates, and the
+    summary is taken from the chunk where the category was largest.
+    """
+    merged: Dict[str, dict] = {}
+    names: Dict[str, str] = {}
+    largest: Dict[str, int] = {}
+
+    for result in results:
+        for name, category in (result or {}).get("categories", {}).items():
+            key = name.strip().casefold()
+            count = int(category.get("categoryCount") or 0)
+
+            if key not in merged:
+                names[key] = name.strip()
+                largest[key] = -1
+                merged[key] = {
+                    "summary": "",
+                    "categoryCount": 0,
+                    "commentInsights": [],
+                    "representativeComments": [],
+                }
+
+            entry = merged[key]
+            entry["categoryCount"] += count
+            entry["commentInsights"].extend(category.get("commentInsights", []))
+            entry["representativeComments"].extend(category.get("representativeComments", []))
+            if count > largest[key]:
+                largest[key] = count
+                entry["summary"] = category.get("summary", "")
+
+    for entry in merged.values():
+        entry["commentInsights"] = _dedupe(entry["commentInsights"], max_insights)
+        entry["representativeComments"] = _dedupe(entry["representativeComments"], max_representative)
+
+    ordered = sorted(merged, key=lambda key: merged[key]["categoryCount"], reverse=True)
+    return {"categories": {names[key]: merged[key] for key in ordered}}
@@ -0,0 +1,88 @@
+"""
+Compact encoding of scraped comments for summarizer prompts.
+
+Comments arrive as dicts that each repeat the video title and their key names.
+Packed, the shared title is stated once and every comment is one line,
+"[likes] text" or "[likes xN] text" for N collapsed near-duplicates, most liked
+first, for as many comments as fit in the token budget.
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import List, NamedTuple, Optional
+
+from ..tokenizer import count_tokens, count_tokens_batch
+
+COMMENT_FORMAT = "Each line is one comment as [likes] text, or [likes xN] text for N near-identical comments."
+
+_WHITESPACE = re.compile(r"\s+")
+# "sooooo" or a row of ten emoji say the same with three
+_REPEATS = re.compile(r"(.)\1{3,}")
+
+
+class PackedComments(NamedTuple):
+    text: str  # Goes into the prompt as is
+    included: int
+    dropped: int
+    tokens: int  # Of `text`, header included
+
+
+def normalize_comment_text(text, max_chars: int = 500) -> str:
+    text = unicodedata.normalize("NFKC", str(text))
+    text = "".join(char for char in text if unicodedata.category(char) != "Cc" or char.isspace())
+    text = _REPEATS.sub(r"\1\1\1", _WHITESPACE.sub(" ", text).strip())
+    if len(text) > max_chars:
+        text = text[:max_chars - 1].rstrip() + "…"
+    return text
+
+
+def encode_comment(comment, max_chars: int = 500) -> str:
+    if not isinstance(comment, dict):
+        return normalize_comment_text(comment, max_chars)
+    count = comment.get("count") or 1
+    marker = f"{comment.get('likes') or 0}{f' x{count}' if count > 1 else ''}"
+    return f"[{marker}] {normalize_comment_text(comment.get('text', ''), max_chars)}"
+
+
+def rank_comments(comments: list) -> list:
+    """Most liked first, ties broken by text so the same comments always pack the same way."""
+    def key(comment):
+        if not isinstance(comment, dict):
+            return (0, str(comment))
+        return (-(comment.get("likes") or 0), str(comment.get("text", "")))
+    return sorted(comments, key=key)
+
+
+def shared_title(comments: list) -> Optional[str]:
+    titles = Counter(
+        comment["title"] for comment in comments if isinstance(comment, dict) and comment.get("title")
+    )
+    return titles.most_common(1)[0][0] if titles else None
+
+
+def pack_comments(comments: list, token_budget: int, max_chars: int = 500) -> PackedComments:
+    """
+    Encode `comments`, most liked first, skipping any whose line would take
+    the comment lines past `token_budget`. Comment text is normalized and cut
+    at `max_chars`.
+    """
+    title = shared_title(comments)
+    header = f"VIDEO TITLE: {normalize_comment_text(title)}\n" if title else ""
+    header += COMMENT_FORMAT
+
+    ranked = rank_comments(comments)
+    lines = [encode_comment(comment, max_chars) for comment in ranked]
+    selected = []
+    used = 0
+    for line, tokens in zip(lines, count_tokens_batch(lines)):
+        if used + tokens > token_budget:
+            continue
+        selected.append(line)
+        used += tokens
+
+    return PackedComments(
+        text="\n".join([header, "", *selected]),
+        included=len(selected),
+        dropped=len(lines) - len(selected),
+        tokens=used + count_tokens(header),
+    )
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+cache_dir = os.path.dirname(os.path.realpath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(cache_dir, "summary_cache.db")
+
+
+TOTALS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS summary_cache_totals_ai AFTER INSERT ON summary_cache BEGIN
+        UPDATE summary_cache_totals SET entries = entries + 1, bytes = bytes + new.size;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS summary_cache_totals_ad AFTER DELETE ON summary_cache BEGIN
+        UPDATE summary_cache_totals SET entries = entries - 1, bytes = bytes - old.size;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS summary_cache_totals_au AFTER UPDATE OF size ON summary_cache BEGIN
+        UPDATE summary_cache_totals SET bytes = bytes - old.size + new.size;
+    END
+    """,
+]
+
+
+def normalize_comments(comments) -> list:
+    """Order-independent, whitespace-insensitive form of a scraped comment set."""
+    normalized = []
+    for comment in comments:
+        if isinstance(comment, dict):
+            comment = {
+                key: re.sub(r"\s+", " ", value).strip() if isinstance(value, str) else value
+                for key, value in comment.items()
+            }
+        else:
+            comment = re.sub(r"\s+", " ", str(comment)).strip()
+        normalized.append(json.dumps(comment, sort_keys=True, ensure_ascii=False))
+    return sorted(normalized)
+
+
+def summary_cache_key(comments, prompt_template: str, model_name: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model_name, prompt_template, *normalize_comments(comments)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    On-disk cache of LLM summaries keyed by the content that produced them.
+
+    Entries are addressed by a hash of the normalized comments, the prompt template
+    and the model name, so identical comment sets never pay for a second LLM call,
+    including across restarts and deploys. Entries older than `max_age` seconds
+    are dropped, and the least recently used entries are evicted once the cache
+    holds more than `max_entries` rows or `max_bytes` of payload.
+
+    Lookups are blocking SQLite calls, coroutines use the `a`-prefixed
+    methods, which run them in a worker thread.
+
+    Entry and byte totals are kept in `summary_cache_totals` by triggers, so
+    checking the limits on a write does not scan the table, and every process
+    sharing the file sees the same totals.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 30 * 24 * 3600,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS summary_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_summary_cache_accessed_at ON summary_cache (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_summary_cache_created_at ON summary_cache (created_at)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS summary_cache_totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+                """
+            )
+            # Counted once, for caches created before the totals were kept
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO summary_cache_totals (id, entries, bytes)
+                SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM summary_cache
+                """
+            )
+            for trigger in TOTALS_TRIGGERS:
+                conn.execute(trigger)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            # Commits on success, rolls back on error
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM summary_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                if row is not None:
+                    conn.execute("DELETE FROM summary_cache WHERE key = ?", (key,))
+                    self.evictions += 1
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE summary_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        self.put_many([(key, value)])
+
+    def put_many(self, items: List[Tuple[str, dict]]):
+        # One transaction and one eviction pass for all items
+        now = time.time()
+        rows = []
+        for key, value in items:
+            payload = json.dumps(value, ensure_ascii=False)
+            rows.append((key, payload, len(payload), now, now))
+        with self._lock, self._connect() as conn:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete would skip the totals trigger
+            conn.executemany(
+                """
+                INSERT INTO summary_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value, size = excluded.size,
+                    created_at = excluded.created_at, accessed_at = excluded.accessed_at
+                """,
+                rows,
+            )
+            self._evict(conn, now)
+
+    def _evict_oldest(self, conn: sqlite3.Connection, count: int):
+        # Least recently used first, walking the accessed_at index
+        self.evictions += conn.execute(
+            "DELETE FROM summary_cache WHERE key IN (SELECT key FROM summary_cache ORDER BY accessed_at LIMIT ?)",
+            (count,),
+        ).rowcount
+
+    def _evict(self, conn: sqlite3.Connection, now: float, batch: int = 64):
+        expired = conn.execute("DELETE FROM summary_cache WHERE created_at < ?", (now - self.max_age,)).rowcount
+        self.evictions += expired
+
+        count, total = self._totals(conn)
+        if count > self.max_entries:
+            self._evict_oldest(conn, count - self.max_entries)
+            count, total = self._totals(conn)
+        while total > self.max_bytes and count:
+            self._evict_oldest(conn, batch)
+            count, total = self._totals(conn)
+
+    def _totals(self, conn: sqlite3.Connection) -> Tuple[int, int]:
+        return conn.execute("SELECT entries, bytes FROM summary_cache_totals").fetchone()
+
+    async def aget(self, key: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aget_many(self, keys: List[str]) -> List[Optional[dict]]:
+        return await asyncio.to_thread(lambda: [self.get(key) for key in keys])
+
+    async def aput(self, key: str, value: dict):
+        await asyncio.to_thread(self.put, key, value)
+
+    async def aput_many(self, items: List[Tuple[str, dict]]):
+        await asyncio.to_thread(self.put_many, items)
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM summary_cache")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            count, total = self._totals(conn)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+_summary_cache: Optional[SummaryCache] = None
+
+
+def get_summary_cache() -> SummaryCache:
+    """Process-wide summary cache, configured from the environment on first use."""
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = SummaryCache(
+            path=os.getenv("SUMMARY_CACHE_PATH", DEFAULT_CACHE_PATH),
+            max_entries=int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 10000)),
+            max_bytes=int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+            max_age=float(os.getenv("SUMMARY_CACHE_MAX_AGE", 30 * 24 * 3600)),
+        )
+    return _summary_cache
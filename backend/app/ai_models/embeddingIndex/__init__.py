@@ -0,0 +1,2 @@
+from .hashingEmbedder import HashingEmbedder
+from .embeddingIndex import EmbeddingIndex, get_embedding_index
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .hashingEmbedder import HashingEmbedder
+
+
+class EmbeddingIndex:
+    """
+    Append-only vector store for each video's categories and raw comments.
+
+    Vectors live in one float32 file that is read through np.memmap, so the index
+    does not have to fit in memory and is shared by the OS page cache across
+    workers. Which row belongs to which video and source, and whether it is still
+    current, is kept in SQLite next to it. Replaced items are only deactivated,
+    their vectors stay in the file.
+
+    Items are (kind, source_id, text), e.g. ("category", VideoComment.id, ...).
+    An item whose text changed under the same id is embedded again.
+    """
+
+    def __init__(self, directory: str, embedder=None):
+        self.directory = directory
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, f"vectors-{self.dim}.f32")
+        self.db_path = os.path.join(directory, "index.db")
+
+        self.searches = 0
+        self.indexed = 0
+        self._lock = threading.Lock()
+        self._memmap: Optional[np.memmap] = None
+
+        with self._connect() as conn:
+            # Indexes made before items were keyed per video can't take a source id
+            # seen under another video, start those over
+            schema = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'items'").fetchone()
+            if schema and "UNIQUE (kind, source_id)" in schema[0]:
+                conn.execute("DROP TABLE items")
+                conn.execute("DROP TABLE IF EXISTS videos")
+                if os.path.exists(self.vectors_path):
+                    os.remove(self.vectors_path)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS items (
+                    row INTEGER PRIMARY KEY,
+                    video_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    source_id INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    active INTEGER NOT NULL DEFAULT 1,
+                    UNIQUE (video_id, kind, source_id)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_items_video_id ON items (video_id, active)")
+            conn.execute("CREATE TABLE IF NOT EXISTS videos (video_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _rows(self) -> int:
+        return os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+
+    def _vectors(self) -> np.ndarray:
+        rows = self._rows()
+        if rows == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        # Remapped only when the file grew
+        if self._memmap is None or self._memmap.shape[0] != rows:
+            self._memmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._memmap
+
+    def version(self, video_id: int) -> Optional[int]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT version FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return row[0] if row else None
+
+    def sync_video(self, video_id: int, version: int, items: List[Tuple[str, int, str]]):
+        """
+        Make the video's active items exactly `items`. Only items not embedded
+        before are embedded and appended, so repeated syncs are incremental.
+        """
+        with self._lock, self._connect() as conn:
+            # Row numbers come from the file size, so writers in other processes wait here
+            conn.execute("BEGIN IMMEDIATE")
+            known = {
+                (kind, source_id): (row, active, text)
+                for row, kind, source_id, active, text in conn.execute(
+                    "SELECT row, kind, source_id, active, text FROM items WHERE video_id = ?", (video_id,)
+                )
+            }
+            wanted = {(kind, source_id) for kind, source_id, _ in items}
+            # Ids are reused after categories are replaced or the database is recreated
+            new_items = [item for item in items if item[:2] not in known or known[item[:2]][2] != item[2]]
+
+            if new_items:
+                vectors = self.embedder.embed([text for _, _, text in new_items]).astype(np.float32)
+                first = self._rows()
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors.tobytes())
+                conn.executemany(
+                    """
+                    INSERT INTO items (row, video_id, kind, source_id, text) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (video_id, kind, source_id) DO UPDATE
+                    SET row = excluded.row, text = excluded.text, active = 1
+                    """,
+                    [(first + i, video_id, kind, source_id, text) for i, (kind, source_id, text) in enumerate(new_items)],
+                )
+                self.indexed += len(new_items)
+
+            stale = [row for key, (row, active, _) in known.items() if active and key not in wanted]
+            revived = [row for key, (row, active, _) in known.items() if not active and key in wanted]
+            conn.executemany("UPDATE items SET active = 0 WHERE row = ?", [(row,) for row in stale])
+            conn.executemany("UPDATE items SET active = 1 WHERE row = ?", [(row,) for row in revived])
+            conn.execute("INSERT OR REPLACE INTO videos (video_id, version) VALUES (?, ?)", (video_id, version))
+
+    def search(self, video_id: int, query: str, k: int = 20) -> List[Tuple[float, str, int, str]]:
+        """Top `k` active items of the video by cosine similarity, as (score, kind, source_id, text)."""
+        with self._connect() as conn:
+            items = conn.execute(
+                "SELECT row, kind, source_id, text FROM items WHERE video_id = ? AND active = 1", (video_id,)
+            ).fetchall()
+        if not items:
+            return []
+
+        self.searches += 1
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock:
+            rows = np.fromiter((item[0] for item in items), dtype=np.int64, count=len(items))
+            scores = self._vectors()[rows] @ query_vector
+
+        k = min(k, len(items))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), items[i][1], items[i][2], items[i][3]) for i in top]
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            active, videos = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT video_id) FROM items WHERE active = 1"
+            ).fetchone()
+        return {
+            "vectors": self._rows(),
+            "active_items": active,
+            "videos": videos,
+            "indexed": self.indexed,
+            "searches": self.searches,
+        }
+
+
+_embedding_index: Optional[EmbeddingIndex] = None
+_embedding_index_lock = threading.Lock()
+
+
+def get_embedding_index(directory: str) -> EmbeddingIndex:
+    """Process-wide index in `directory`, created on first use."""
+    global _embedding_index
+    with _embedding_index_lock:
+        if _embedding_index is None:
+            _embedding_index = EmbeddingIndex(
+                directory=directory,
+                embedder=HashingEmbedder(dim=int(os.getenv("EMBEDDING_DIM", 512))),
+            )
+        return _embedding_index
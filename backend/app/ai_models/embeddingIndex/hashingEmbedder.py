@@ -0,0 +1,47 @@
+import re
+import zlib
+from typing import List
+
+import numpy as np
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """
+    Dependency-free text embeddings for CPU: word unigrams, word bigrams and
+    character trigrams are hashed into `dim` signed buckets, weighted by
+    sublinear term frequency and L2-normalized, so a dot product is a cosine.
+
+    Good enough to rank a video's own categories and comments against a
+    question; any object with `dim` and `embed(texts) -> float32 array` can be
+    used in its place.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = WORD_RE.findall(text.casefold())
+        features = list(words)
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"#{word}#"
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.uint32, count=len(features))
+            buckets = (hashes % self.dim).astype(np.int64)
+            # The top hash bit picks the sign, so collisions tend to cancel out
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], buckets, signs)
+
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
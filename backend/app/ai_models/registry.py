@@ -0,0 +1,82 @@
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of LLM-backed chains.
+
+    Each entry names the module and class that builds it. The module (and the
+    LangChain/Gemini packages it pulls in) is only imported the first time the
+    entry is requested, and the instance is then shared by every request. Import,
+    build and first-call timings are kept for each entry.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, tuple] = {}
+        self._instances: Dict[str, object] = {}
+        self._timings: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, module: str, attr: str, package: Optional[str] = None, **kwargs):
+        self._specs[name] = (module, attr, package, kwargs)
+        self._timings[name] = {"import_seconds": None, "build_seconds": None, "first_call_seconds": None}
+
+    def override(self, name: str, instance):
+        """Use an already built instance, e.g. a stand-in model for benchmarks."""
+        with self._lock:
+            self._instances[name] = instance
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            # Another thread may have built it while we waited for the lock
+            if name not in self._instances:
+                module, attr, package, kwargs = self._specs[name]
+
+                start = time.perf_counter()
+                factory = getattr(importlib.import_module(module, package), attr)
+                built = time.perf_counter()
+                self._instances[name] = factory(**kwargs)
+
+                self._timings[name]["import_seconds"] = built - start
+                self._timings[name]["build_seconds"] = time.perf_counter() - built
+            return self._instances[name]
+
+    def warmup(self, *names: str):
+        """Build the given entries (all of them by default) ahead of the first request."""
+        for name in names or self._specs:
+            self.get(name)
+
+    @contextmanager
+    def first_call(self, name: str):
+        """Times the wrapped call, recorded only for the first call of an entry."""
+        start = time.perf_counter()
+        yield
+        if self._timings[name]["first_call_seconds"] is None:
+            self._timings[name]["first_call_seconds"] = time.perf_counter() - start
+
+    def stats(self) -> dict:
+        return {
+            name: {"built": name in self._instances, **timings}
+            for name, timings in self._timings.items()
+        }
+
+
+model_registry = ModelRegistry()
+model_registry.register("comment_summary", ".commentSummarizer.commentSummary", "CommentSummary", package=__package__)
+model_registry.register("feedback_agent", "..agents.video_feedback_agent", "VideoFeedbackAgent", package=__package__)
+
+
+def get_comment_summary():
+    return model_registry.get("comment_summary")
+
+
+def get_feedback_agent():
+    return model_registry.get("feedback_agent")
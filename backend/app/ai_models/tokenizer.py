@@ -0,0 +1,52 @@
+import json
+import os
+from functools import lru_cache
+from typing import List
+
+ai_models_dir = os.path.dirname(os.path.realpath(__file__))
+DEFAULT_TOKENIZER_PATH = os.path.join(ai_models_dir, "tokenizer.json")
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """
+    A Hugging Face `tokenizers` tokenizer loaded from TOKENIZER_PATH, e.g. the
+    tokenizer.json of a Gemma model as a close match for Gemini. None when the
+    file or the `tokenizers` package is missing, counts are estimated then.
+    """
+    path = os.getenv("TOKENIZER_PATH", DEFAULT_TOKENIZER_PATH)
+    if not os.path.isfile(path):
+        return None
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        print(f"tokenizers is not installed, estimating token counts instead of using {path}")
+        return None
+    return Tokenizer.from_file(path)
+
+
+def _estimate_tokens(text: str) -> int:
+    # Roughly 4 characters per token for English, but never fewer tokens than
+    # whitespace separated words
+    return max(len(text) // 4, len(text.split()), 1 if text else 0)
+
+
+def count_tokens(text) -> int:
+    """
+    Local count of LLM tokens for budgeting prompts, exact for the configured
+    tokenizer and estimated without one. Non-string values are measured as JSON.
+    """
+    if not isinstance(text, str):
+        text = json.dumps(text, ensure_ascii=False)
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return _estimate_tokens(text)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """`count_tokens` of each text, tokenized in one parallel call when a tokenizer is configured."""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [_estimate_tokens(text) for text in texts]
+    return [len(encoding.ids) for encoding in tokenizer.encode_batch(texts, add_special_tokens=False)]
@@ -0,0 +1,12 @@
+from .videoSummary import VideoSummarizerPool, video_model_available
+
+
+def __getattr__(name):
+    # PyAV and torch are only imported once frames are actually decoded
+    if name == "sample_frames":
+        from .frameSampler import sample_frames
+        return sample_frames
+    if name == "VideoSummary":
+        from .videoSummary import VideoSummary
+        return VideoSummary
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,63 @@
+from typing import List
+
+import av
+import numpy as np
+
+
+def _thumbnail(frame: "av.VideoFrame", size: int) -> np.ndarray:
+    # Tiny grayscale copy, enough to tell a cut from a near-identical frame
+    return frame.to_ndarray(format="gray", width=size, height=size).astype(np.int16)
+
+
+def sample_frames(
+    path: str,
+    max_frames: int = 16,
+    scene_threshold: float = 0.12,
+    min_interval: float = 0.5,
+    frame_size: int = 336,
+    thumb_size: int = 32,
+    keyframes_after: float = 120.0,
+) -> List[np.ndarray]:
+    """
+    Decode `path` as a stream and keep at most `max_frames` RGB frames of
+    `frame_size` x `frame_size`, in time order.
+
+    A frame is kept when at least `min_interval` seconds passed since the last
+    kept one and its thumbnail differs from it by more than `scene_threshold`
+    (mean absolute difference, 0..1), so static shots yield one frame. Only
+    kept frames are converted to full size RGB. Once twice `max_frames` are held,
+    every other one is dropped and `min_interval` doubles, so memory stays
+    bounded for any length. Videos longer than `keyframes_after` seconds only
+    decode keyframes.
+    """
+    frames: List[np.ndarray] = []
+    last_thumb = None
+    last_time = None
+
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        duration = float(container.duration / av.time_base) if container.duration else 0.0
+        if keyframes_after and duration > keyframes_after:
+            stream.codec_context.skip_frame = "NONKEY"
+
+        for frame in container.decode(stream):
+            time = frame.time or 0.0
+            if last_time is not None and time - last_time < min_interval:
+                continue
+
+            thumb = _thumbnail(frame, thumb_size)
+            if last_thumb is not None and np.abs(thumb - last_thumb).mean() / 255 < scene_threshold:
+                continue
+
+            frames.append(frame.to_ndarray(format="rgb24", width=frame_size, height=frame_size))
+            last_thumb, last_time = thumb, time
+
+            if len(frames) >= 2 * max_frames:
+                frames = frames[::2]
+                min_interval *= 2
+
+    if len(frames) > max_frames:
+        keep = np.linspace(0, len(frames) - 1, max_frames).round().astype(int)
+        frames = [frames[i] for i in keep]
+    return frames
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+# Where downloadModel.py saves LLaVA-NeXT-Video
+backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+DEFAULT_MODEL_PATH = os.path.join(backend_dir, "ai_models", "videoSummarizer", "llava-next")
+
+PROMPT = (
+    "Describe this short-form video for its creator: the setting, who appears, "
+    "what happens, any on-screen text and the overall tone. Be concise."
+)
+
+
+class VideoSummary:
+    """
+    LLaVA-NeXT-Video on CPU, loaded once per process.
+
+    Note that a model saved with 4-bit bitsandbytes quantization needs CUDA, for
+    CPU inference point VIDEO_MODEL_PATH at an unquantized save.
+    """
+
+    def __init__(
+        self,
+        model_path: str = os.getenv("VIDEO_MODEL_PATH", DEFAULT_MODEL_PATH),
+        max_new_tokens: int = int(os.getenv("VIDEO_SUMMARY_MAX_TOKENS", 200)),
+        threads: int = int(os.getenv("VIDEO_TORCH_THREADS", 0)),
+    ):
+        import torch
+        from transformers import LlavaNextVideoForConditionalGeneration, LlavaNextVideoProcessor
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.max_new_tokens = max_new_tokens
+        self.processor = LlavaNextVideoProcessor.from_pretrained(model_path)
+        self.model = LlavaNextVideoForConditionalGeneration.from_pretrained(
+            model_path, torch_dtype=torch.float32, low_cpu_mem_usage=True
+        ).eval()
+
+    def summarize(self, frames: List["np.ndarray"]) -> str:
+        import numpy as np
+
+        conversation = [{"role": "user", "content": [{"type": "text", "text": PROMPT}, {"type": "video"}]}]
+        prompt = self.processor.apply_chat_template(conversation, add_generation_prompt=True)
+        inputs = self.processor(text=prompt, videos=np.stack(frames), return_tensors="pt")
+
+        with self.torch.inference_mode():
+            output = self.model.generate(**inputs, max_new_tokens=self.max_new_tokens, do_sample=False)
+        # Only the generated continuation, not the echoed prompt
+        generated = output[0][inputs["input_ids"].shape[1]:]
+        return self.processor.decode(generated, skip_special_tokens=True).strip()
+
+
+# Per worker process, built by the pool initializer
+_worker_model: Optional[VideoSummary] = None
+
+
+def _init_worker():
+    global _worker_model
+    _worker_model = VideoSummary()
+
+
+def _summarize_file(path: str, max_frames: int) -> str:
+    from .frameSampler import sample_frames
+
+    frames = sample_frames(path, max_frames=max_frames)
+    if not frames:
+        return ""
+    return _worker_model.summarize(frames)
+
+
+class VideoSummarizerPool:
+    """
+    Worker processes that each load the model once, decode with PyAV and run
+    inference off the event loop. Processes are spawned, not forked, so the API
+    process's threads and sockets are not copied into them.
+
+    A pool whose workers died, e.g. because the model failed to load, is rebuilt
+    on the next call. After `max_failures` broken pools in a row the pool is
+    disabled and every later call fails fast.
+    """
+
+    def __init__(
+        self,
+        workers: int = int(os.getenv("VIDEO_SUMMARY_WORKERS", 1)),
+        max_frames: int = int(os.getenv("VIDEO_SUMMARY_MAX_FRAMES", 16)),
+        max_failures: int = int(os.getenv("VIDEO_SUMMARY_MAX_FAILURES", 3)),
+    ):
+        self.workers = workers
+        self.max_frames = max_frames
+        self.max_failures = max_failures
+        self.failures = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def disabled(self) -> bool:
+        return self.failures >= self.max_failures
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    async def summarize_file(self, path: str) -> str:
+        if self.disabled:
+            raise RuntimeError(f"Video summarizer disabled after {self.failures} broken worker pools")
+        loop = asyncio.get_running_loop()
+        try:
+            summary = await loop.run_in_executor(self.executor, _summarize_file, path, self.max_frames)
+        except BrokenProcessPool:
+            self.failures += 1
+            self.shutdown()
+            print(f"Video summarizer workers died ({self.failures}/{self.max_failures}), "
+                  f"{'disabling it' if self.disabled else 'restarting them'}")
+            raise
+        self.failures = 0
+        return summary
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def video_model_available(model_path: str = os.getenv("VIDEO_MODEL_PATH", DEFAULT_MODEL_PATH)) -> bool:
+    """Whether weights that can load on this machine are saved at `model_path`."""
+    config_path = os.path.join(model_path, "config.json")
+    if not os.path.isfile(config_path):
+        return False
+    with open(config_path) as f:
+        config = json.load(f)
+    # downloadModel.py saves 4-bit bitsandbytes weights, which only load on CUDA
+    if config.get("quantization_config"):
+        try:
+            import torch
+        except ImportError:
+            return False
+        return torch.cuda.is_available()
+    return True
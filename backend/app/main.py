@@ -4,27 +4,102 @@ import sys
 script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(script_dir)
 
-from typing import List, Dict
-import requests
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 import json
+import time
+import tempfile
+from contextlib import aclosing, asynccontextmanager
 
-from fastapi import FastAPI, Query, Body, Depends
+from fastapi import FastAPI, Query, Body, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session  
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
 
-from .ai_models import CommentSummary
-from .sql_app import crud, models, schemas
+from .ai_models import get_comment_summary, get_feedback_agent, get_summary_cache, model_registry
+from .ai_models.commentDeduplicator import collapse_near_duplicates
+from .ai_models.commentSummarizer.mapReduce import merge_comment_categories
+from .ai_models.videoSummarizer import VideoSummarizerPool, video_model_available
+from .ai_models.tokenizer import count_tokens
+from .sql_app import async_crud, crud, models, schemas
 from .sql_app.database import SessionLocal, engine
-from .agents import VideoFeedbackAgent
+from .sql_app.async_database import AsyncSessionLocal, async_engine
+from .sql_app.migrations import run_migrations
+from .sql_app.pagination import decode_cursor, encode_cursor
+from .sql_app.search import match_query
+from .sql_app.snapshots import encode, make_etag, serialize_video
+from . import agents
+from .agents import ChatContextCache
+from .scraper import ScrapeError, TopKComments, backoff_delay, get_scraper, close_scraper
+from .pipeline import JobQueue, LeaseFlight, SingleFlight
+from .observability import PROFILING_ENABLED, SCRAPE_PAGES, profile_request, record_comments, register_gauge, render_metrics, span
 
-from datetime import datetime
+from datetime import datetime, timedelta
+
+CHAT_HISTORY_TTL = timedelta(seconds=float(os.getenv("CHAT_HISTORY_TTL", 7 * 24 * 3600)))
+
+async def purgeChatHistoryPeriodically(interval: float = 3600):
+    while True:
+        try:
+            removed = await agents.purge_expired_chat_history(CHAT_HISTORY_TTL)
+            if removed:
+                print(f"Purged {removed} expired chat sessions")
+        except Exception as e:
+            # e.g. a locked database, the next round tries again
+            print(f"Error in purgeChatHistoryPeriodically: {e}")
+        await asyncio.sleep(interval)
+
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", 0))
+
+async def refreshVideosPeriodically(interval: float):
+    # Refreshes the videos least recently refreshed, a few at a time
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                due = await async_crud.get_videos_due_for_refresh(
+                    db, datetime.utcnow() - timedelta(seconds=interval), limit=int(os.getenv("REFRESH_BATCH", 10)))
+        except Exception as e:
+            # A failed round must not end periodic refreshing for the life of the process
+            print(f"Error in refreshVideosPeriodically: {e}")
+            continue
+        outcomes = await asyncio.gather(*[refreshOnce(video.url) for video in due], return_exceptions=True)
+        for video, outcome in zip(due, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Error refreshing {video.url}: {outcome}")
+            else:
+                print(f"Refreshed {video.url}: {outcome[0]}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("LLM_WARMUP", "1") != "0":
+        # Build the shared chains before the first request instead of during it
+        await asyncio.to_thread(model_registry.warmup)
+    summarize_jobs.start()
+    await resumeSummarizeJobs()
+    job_resume = asyncio.create_task(resumeSummarizeJobsPeriodically(summarize_leases.ttl))
+    if VIDEO_SUMMARIES:
+        video_summary_jobs.start()
+    chat_history_cleanup = asyncio.create_task(purgeChatHistoryPeriodically())
+    # REFRESH_INTERVAL=0 (the default) leaves refreshing to POST /summarize/refresh
+    video_refresh = asyncio.create_task(refreshVideosPeriodically(REFRESH_INTERVAL)) if REFRESH_INTERVAL else None
+    yield
+    chat_history_cleanup.cancel()
+    job_resume.cancel()
+    if video_refresh:
+        video_refresh.cancel()
+    await summarize_jobs.stop()
+    await video_summary_jobs.stop()
+    video_summarizer.shutdown()
+    # Release the pooled scraper connections on shutdown
+    await close_scraper()
+    await async_engine.dispose()
 
 def create_app():
-    app=FastAPI()
+    app=FastAPI(lifespan=lifespan)
     app.state.my_state=False
 
     return app
@@ -36,7 +111,11 @@ def get_db():
     finally:
         db.close()
 
-models.Base.metadata.create_all(bind=engine)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+run_migrations(engine)
 
 app=create_app()
 
@@ -49,7 +128,10 @@ app.add_middleware(
     allow_headers=["*"],  # You can restrict this to specific headers if needed
 )
 
-agent = VideoFeedbackAgent()
+# Per-request cProfile dumps for requests with an `X-Profile: 1` header. Only installed
+# with PROFILING_ENABLED=1, so normal deployments and streamed responses skip the middleware
+if PROFILING_ENABLED:
+    app.middleware("http")(profile_request)
 
 class FeedbackRequest(BaseModel):
     url: str
@@ -64,6 +146,20 @@ class VideoResponse(BaseModel):
 
 class VideoURLS(BaseModel):
     URLS: List[str]
+    # Number of most liked comments sent to the summarizer for each video,
+    # large values are summarized in map-reduce chunks
+    topK: int = Field(default=250, ge=1, le=100000)
+
+class SummarizeJobResponse(BaseModel):
+    job_id: str
+    status: str
+    stage: Optional[str] = None
+    urls: List[str]
+    progress: Dict[str, str]
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
 
 class VideoSummaryInput(BaseModel):
     videoLink: str
@@ -85,26 +181,73 @@ def home():
     """
     return {"text": "Site is up!"}
 
+@app.get("/stats", tags=["stats"])
+def read_stats():
+    """
+    API to check cache effectiveness
+    """
+    return {
+        "summary_cache": get_summary_cache().stats(),
+        "summarize_jobs": summarize_jobs.stats(),
+        "video_summaries": {**video_summary_jobs.stats(), "disabled": video_summarizer.disabled},
+        "chat_context_cache": chat_context_cache.stats(),
+        "scrape_leases": summarize_leases.stats(),
+        "embedding_index": agents.embedding_index().stats(),
+        "models": model_registry.stats(),
+        "scraper": get_scraper().stats()
+    }
+
+@app.get("/metrics", tags=["stats"])
+def read_metrics():
+    """
+    Prometheus exposition: per-stage timing histograms, LLM token and comment
+    counts, scrape page outcomes and the scraper's rate limiter state
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+register_gauge("tiktok_scraper_concurrency_limit", "Current AIMD concurrency limit of the scraper",
+               lambda: get_scraper().limiter.limit)
+register_gauge("tiktok_scraper_in_flight", "Scrape requests in flight",
+               lambda: get_scraper().limiter.in_flight)
+register_gauge("tiktok_scraper_throttled", "429 responses seen by the scraper",
+               lambda: get_scraper().limiter.throttled)
+register_gauge("tiktok_scraper_tokens", "Tokens left in the scraper's rate limit bucket",
+               lambda: get_scraper().bucket.stats()["tokens"])
+
 # Video endpoints
 @app.post("/videos/", tags=["videos"])
-def create_video(video: schemas.VideoCreate, db: Session = Depends(get_db)):
-    return JSONResponse(content=crud.create_video(db=db, video=video).__dict__)
+async def create_video(video: schemas.VideoCreate, db: AsyncSession = Depends(get_async_db)):
+    return JSONResponse(content=videoColumns(await async_crud.create_video(db=db, video=video)))
 
 @app.get("/videos/", tags=["videos"])
-def read_videos(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    videos = crud.get_videos(db, skip=skip, limit=limit)
-    return JSONResponse(content={"videos": [video.__dict__ for video in videos]})
+async def read_videos(
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stored videos by id. Pass `next_cursor` of a page as `cursor` to get the next one
+    """
+    try:
+        after = decode_cursor(cursor, 1)
+    except ValueError as e:
+        return JSONResponse(status_code=422, content={"Error": str(e)})
+
+    videos = await async_crud.get_videos(db, after_id=after[0] if after else 0, limit=limit)
+    next_cursor = encode_cursor(videos[-1].id) if len(videos) == limit else None
+    return JSONResponse(content={"videos": [videoColumns(video) for video in videos], "next_cursor": next_cursor})
 
 @app.get("/videos/{video_id}", tags=["videos"])
-def read_video(video_id: int, db: Session = Depends(get_db)):
-    db_video = crud.get_video(db, video_id=video_id)
+async def read_video(video_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_video = await async_crud.get_video(db, video_id=video_id)
     if db_video is None:
         return JSONResponse(status_code=404, content={"Error": "Video not found"})
-    return JSONResponse(content=db_video.__dict__)
+    return JSONResponse(content=videoColumns(db_video))
 
 @app.get("/videos/by_url/", tags=["videos"])
-def read_video_by_url(video_url: str, db: Session = Depends(get_db)):
-    db_video = crud.get_video_by_url(db, url=video_url)
+async def read_video_by_url(video_url: str, db: AsyncSession = Depends(get_async_db)):
+    db_video = await async_crud.get_video_by_url(db, url=video_url)
     if db_video is None:
         return JSONResponse(status_code=404, content={"Error": "Video not found"})
     video_response = VideoResponse(
@@ -115,146 +258,740 @@ def read_video_by_url(video_url: str, db: Session = Depends(get_db)):
     )
     return video_response
 
+@app.get("/search", tags=["videos"])
+async def search_videos(
+    q: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stored videos whose title or comment categories match `q`, most relevant
+    first, with the matching categories highlighted
+    """
+    query = match_query(q)
+    if not query:
+        return JSONResponse(status_code=422, content={"Error": "q must contain a word"})
+    try:
+        after = decode_cursor(cursor, 2)
+    except ValueError as e:
+        return JSONResponse(status_code=422, content={"Error": str(e)})
+
+    with span("search"):
+        hits = await async_crud.search_videos(db, query, after=after, limit=limit)
+        snippets = await async_crud.get_search_snippets(db, query, [video.id for video, _ in hits])
+
+    matches = {}
+    for video_id, category, snippet in snippets:
+        matches.setdefault(video_id, []).append({"category": category, "snippet": snippet})
+
+    results = [
+        {**videoColumns(video), "score": -score, "matches": matches.get(video.id, [])[:3]}
+        for video, score in hits
+    ]
+    next_cursor = encode_cursor(hits[-1][1], hits[-1][0].id) if len(hits) == limit else None
+    return JSONResponse(content={"results": results, "next_cursor": next_cursor})
+
 # Summarization endpoint
 @app.post("/summarize/")
 async def summarize_video_and_comments(
     videoURLS: VideoURLS = Body(
         ..., description="List of video URLs to scrape comments from"),
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):  
     if not videoURLS.URLS or len(videoURLS.URLS) == 0:
-        return JSONResponse(status=422 ,content={"Error": "videoURLS cannot be empty"})
+        return JSONResponse(status_code=422, content={"Error": "videoURLS cannot be empty"})
 
-    results = {}
+    urls = list(dict.fromkeys(videoURLS.URLS))
 
-    for url in videoURLS.URLS:
-        # Check if video exists in database
-        db_video = db.query(models.Video).filter(models.Video.url == url).first()
-        
-        if db_video:
-            # Video exists, retrieve comments
-            comments = crud.get_video_comments_by_video(db, video_id=db_video.id)
-            comment_dicts = []
-            for comment in comments:
-                summary = comment.__dict__["summary"]
-                category_count = comment.__dict__["category_count"]
-                comment_insights = json.loads(comment.__dict__["comment_insights"])
-                representative_comments = json.loads(comment.__dict__["representative_comments"])
-                comment_dict = {
-                    "summary": summary,
-                    "categoryCount": category_count,
-                    "commentInsights": comment_insights,
-                    "representativeComments": representative_comments
-                }
-                comment_dicts.append(comment_dict)
-            results[url] = {
-                "video_summary": db_video.summary,
-                "title": db_video.title,
-                "categories": {comment.comment_category: comment_dict for comment, comment_dict in zip(comments, comment_dicts)}
-            }
+    # Stage 1: resolve every cache hit with a single query on the stored snapshots
+    snapshots = await loadSnapshots(db, urls)
+    misses = [url for url in urls if url not in snapshots]
+
+    if not misses:
+        # All cached: send the stored JSON as-is, or nothing if the client already has it
+        etag = '"' + make_etag(*[snapshots[url][1] for url in urls]) + '"'
+        if etagMatches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        body = snapshotBody({url: snapshots[url][0] for url in urls})
+        return Response(content='{"results":' + body + '}', media_type="application/json", headers={"ETag": etag})
+
+    # Stage 2: scrape and summarize the misses concurrently. Concurrent requests for
+    # the same URL share one job across all workers, parallelism is bounded by summarize_slots.
+    outcomes = await asyncio.gather(*[summarizeOnce(url, videoURLS.topK) for url in misses])
+
+    fragments = {url: snapshot for url, (snapshot, _) in snapshots.items()}
+    failed = False
+    for url, (data, err) in zip(misses, outcomes):
+        if err:
+            fragments[url] = encode({"Error": data["Error"]})
+            failed = True
         else:
-            # Video doesn't exist, perform summarization
-            # try:
-            singleURLInput: VideoURLS = VideoURLS(URLS=[url])
+            fragments[url] = encode(data)
 
-            data, err = summarize_comments_helper(threads=100, retries=3, scrapeCount=50, videoURLS=singleURLInput)
-            if err:
-                results[url] = {"Error": data["Error"]}
-                return JSONResponse(status=422, content=results)
-            else:
-                comment_summaries = data["results"][url]['categories']
-                title = data["results"][url]['title']
-            print(comment_summaries)
-            
-            # Store results in database
-            new_video = crud.create_video(db, schemas.VideoCreate(
-                url=url,
-                title=title,
-                summary=""
-            ))
-            
-            stored_comments = []
-            for comment_category, comment_summary in comment_summaries.items():
-                print(comment_category, comment_summary)
-                stored_comment = crud.create_video_comment(db, schemas.VideoCommentCreate(
-                    video_id=new_video.id,
-                    comment_category=comment_category,
-                    summary=comment_summary["summary"],
-                    category_count=comment_summary["categoryCount"],
-                    comment_insights=json.dumps(comment_summary.get("commentInsights", [''])),
-                    representative_comments=json.dumps(comment_summary.get("representativeComments", [''])),
-                ))
-                stored_comments.append(stored_comment.__dict__)
-            
-            results[url] = {
-                "video_summary": "",
-                "title": title,
-                "categories": comment_summaries
-            }
+    body = snapshotBody({url: fragments[url] for url in urls})
+    if failed:
+        return Response(status_code=422, content=body, media_type="application/json")
+    return Response(content='{"results":' + body + '}', media_type="application/json")
+
+STREAM_PARTIAL_INTERVAL = float(os.getenv("STREAM_PARTIAL_INTERVAL", 0.25))
+
+@app.post("/summarize/stream")
+async def stream_summarize_video_and_comments(
+    videoURLS: VideoURLS = Body(
+        ..., description="List of video URLs to scrape comments from"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Streams each URL's result as Server-Sent Events as soon as it is ready: an
+    `event: result` with {"url", "result"} per URL, cached ones first. While a
+    miss is being summarized, `event: partial` events carry {"url", "categories"}
+    parsed so far, at most every STREAM_PARTIAL_INTERVAL seconds. Failed URLs get
+    an `event: error`, and the stream ends with `event: done`
+    """
+    if not videoURLS.URLS or len(videoURLS.URLS) == 0:
+        return JSONResponse(status_code=422, content={"Error": "videoURLS cannot be empty"})
+
+    urls = list(dict.fromkeys(videoURLS.URLS))
+    snapshots = await loadSnapshots(db, urls)
+    misses = [url for url in urls if url not in snapshots]
+    events_queue: asyncio.Queue = asyncio.Queue()
 
+    async def summarizeMiss(url: str):
+        last_partial = 0.0
+
+        async def onPartial(summary: dict):
+            nonlocal last_partial
+            now = time.monotonic()
+            if now - last_partial >= STREAM_PARTIAL_INTERVAL:
+                last_partial = now
+                await events_queue.put(("partial", {"url": url, "categories": (summary or {}).get("categories", {})}))
+
+        try:
+            data, err = await summarizeOnce(url, videoURLS.topK, onPartial=onPartial)
+        except Exception as e:
+            print(f"Error in stream_summarize_video_and_comments: {e}")
+            data, err = {"Error": str(e)}, True
+        if err:
+            await events_queue.put(("error", {"url": url, "Error": data["Error"]}))
+        else:
+            await events_queue.put(("result", {"url": url, "result": data}))
+
+    async def events():
+        # Stored snapshots are spliced in as they are, like on /summarize
+        for url in urls:
+            if url in snapshots:
+                yield f'event: result\ndata: {{"url":{encode(url)},"result":{snapshots[url][0]}}}\n\n'
+
+        tasks = [asyncio.create_task(summarizeMiss(url)) for url in misses]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event, payload = await events_queue.get()
+                if event != "partial":
+                    remaining -= 1
+                yield f"event: {event}\ndata: {encode(payload)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            # Jobs run shielded in summarize_flights, a client hanging up only stops its own waiters
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/summarize/refresh")
+async def refresh_video_summaries(
+    videoURLS: VideoURLS = Body(
+        ..., description="List of already summarized video URLs to refresh"),
+):
+    """
+    Scrapes only comments newer than each video's watermark and updates its
+    categories from them. `mode` in each result is "none" when too few new
+    comments came in, "delta" when they were summarized and merged into the
+    stored categories, "full" when drift required re-summarizing, or "shared"
+    when another worker refreshed the video meanwhile.
+    """
+    if not videoURLS.URLS or len(videoURLS.URLS) == 0:
+        return JSONResponse(status_code=422, content={"Error": "videoURLS cannot be empty"})
+
+    urls = list(dict.fromkeys(videoURLS.URLS))
+    outcomes = await asyncio.gather(*[refreshOnce(url, videoURLS.topK) for url in urls])
+
+    results = {url: data for url, (data, err) in zip(urls, outcomes)}
+    if any(err for _, err in outcomes):
+        return JSONResponse(status_code=422, content=results)
     return JSONResponse(content={"results": results})
 
+# Background summarization jobs
+@app.post("/summarize/jobs", tags=["jobs"], status_code=202)
+async def create_summarize_job(
+    videoURLS: VideoURLS = Body(
+        ..., description="List of video URLs to scrape comments from"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not videoURLS.URLS or len(videoURLS.URLS) == 0:
+        return JSONResponse(status_code=422, content={"Error": "videoURLS cannot be empty"})
+
+    # Backpressure: refuse new work instead of growing the queue without bound
+    if summarize_jobs.full():
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "5"},
+            content={"Error": "Too many summarize jobs queued, try again later"}
+        )
+
+    job = await async_crud.create_summarize_job(db, schemas.SummarizeJobCreate(
+        urls=list(dict.fromkeys(videoURLS.URLS)),
+        top_k=videoURLS.topK
+    ))
+    summarize_jobs.submit(job.id)
+
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/summarize/jobs/{job_id}", tags=["jobs"], response_model=SummarizeJobResponse)
+async def read_summarize_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await async_crud.get_summarize_job(db, job_id=job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"Error": "Job not found"})
+    return SummarizeJobResponse(
+        job_id=job.id,
+        status=job.status,
+        stage=job.stage,
+        urls=json.loads(job.urls),
+        progress=json.loads(job.progress),
+        result=json.loads(job.result) if job.result else None,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
 @app.post("/chat")
-def chat_with_llm(request: FeedbackRequest, db: Session = Depends(get_db)):
-    video = crud.get_video_by_url(db, url=request.url)
-    if not video:
-        raise JSONResponse(status=404, content={"Error": "Video Not Found"})
-    
-    comments = crud.get_comments_by_video_id(db, video_id=video.id)
+async def chat_with_llm(request: FeedbackRequest, db: AsyncSession = Depends(get_async_db)):
+    context = await getChatContext(db, request.url, request.user_input)
+    if context is None:
+        return JSONResponse(status_code=404, content={"Error": "Video Not Found"})
     
-    # Generate a session ID
-    date = datetime.now().strftime("%d-%m-%Y")
-    session_id = f"session_{request.url}_{date}"
+    session_id = chatSessionId(request.url)
     
-    feedback = agent.generate_feedback(video, comments, request.user_input, session_id, request.url)
+    with model_registry.first_call("feedback_agent"), span("feedback_agent"):
+        feedback = await get_feedback_agent().agenerate_feedback(context, request.user_input, session_id)
     
     return {"feedback": feedback}
 
+@app.post("/chat/stream")
+async def stream_chat_with_llm(request: FeedbackRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Streams the response as Server-Sent Events: one `data: {"token": ...}` event per
+    chunk, then an `event: done` (or `event: error`) event
+    """
+    context = await getChatContext(db, request.url, request.user_input)
+    if context is None:
+        return JSONResponse(status_code=404, content={"Error": "Video Not Found"})
+
+    session_id = chatSessionId(request.url)
+
+    async def events():
+        try:
+            with span("feedback_agent_stream"):
+                async for token in get_feedback_agent().astream_feedback(context, request.user_input, session_id):
+                    yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            print(f"Error in stream_chat_with_llm: {e}")
+            yield f"event: error\ndata: {json.dumps({'Error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # Helper Functions
 
-########## Scrape Comments #############
-def scrapeHandler(
-    awemeID: str, scrapeCount: int, curr: int
-) -> tuple[list[str], bool, bool]:
-    url = f"https://www.tiktok.com/api/comment/list/?aweme_id={awemeID}&count={scrapeCount}&cursor={curr}"
-    payload = {}
-    headers = {
-        "accept": "*/*",
-        "accept-language": "en-US,en;q=0.9",
-        "dnt": "1",
-        "priority": "u=1, i",
-        "sec-ch-ua": '"Not/A)Brand";v="8", "Chromium";v="126"',
-        "sec-ch-ua-mobile": "?0",
-        "sec-ch-ua-platform": '"macOS"',
-        "sec-fetch-dest": "empty",
-        "sec-fetch-mode": "cors",
-        "sec-fetch-site": "same-origin",
-        "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+########## Chat #############
+def chatSessionId(url: str) -> str:
+    # One chat session per video per day
+    date = datetime.now().strftime("%d-%m-%Y")
+    return f"session_{url}_{date}"
+
+chat_context_cache = ChatContextCache(max_entries=int(os.getenv("CHAT_CONTEXT_CACHE_SIZE", 1024)))
+crud.on_video_comments_changed(chat_context_cache.invalidate)
+
+# Embeddings are updated in the background whenever a video's comments change
+embedding_tasks = set()
+
+@crud.on_video_comments_changed
+def indexVideoInBackground(video_id: int):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        agents.index_video(video_id)
+        return
+    task = loop.create_task(asyncio.to_thread(agents.index_video, video_id))
+    embedding_tasks.add(task)
+    task.add_done_callback(indexVideoDone)
+
+def indexVideoDone(task: asyncio.Task):
+    embedding_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error indexing video embeddings: {task.exception()!r}")
+
+CHAT_RETRIEVAL = os.getenv("CHAT_RETRIEVAL", "1") != "0"
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 1500))
+
+async def getChatContext(db: AsyncSession, url: str, question: Optional[str] = None):
+    video = await async_crud.get_video_by_url(db, url=url)
+    if video is None:
+        return None
+
+    # Rendered once per content version instead of on every chat turn
+    version = video.content_version or 0
+    context = chat_context_cache.get(video.id, version)
+    if context is None:
+        comments = await async_crud.get_comments_by_video_id(db, video_id=video.id)
+        context = get_feedback_agent().render_context(video, comments)
+        chat_context_cache.put(video.id, version, context)
+
+    # Past the budget, only the categories and comments relevant to the question are sent
+    if question and CHAT_RETRIEVAL and count_tokens(context["comments_summary"]) > CHAT_CONTEXT_TOKEN_BUDGET:
+        try:
+            with span("chat_retrieval"):
+                snippets = await asyncio.to_thread(agents.retrieve_snippets, video.id, version, question)
+        except Exception as e:
+            # The full context still answers the question, just with more tokens
+            print(f"Error retrieving chat context: {e!r}")
+            snippets = []
+        if snippets:
+            context = get_feedback_agent().render_snippets(context, snippets, CHAT_CONTEXT_TOKEN_BUDGET)
+    return context
+
+########## Summarize Pipeline #############
+summarize_flights = SingleFlight()
+# Extends the single flight to other uvicorn workers and containers sharing video.db
+summarize_leases = LeaseFlight(AsyncSessionLocal)
+summarize_slots = asyncio.Semaphore(int(os.getenv("SUMMARIZE_CONCURRENCY", 4)))
+
+async def storedSummary(url: str):
+    async with AsyncSessionLocal() as db:
+        snapshots = await loadSnapshots(db, [url])
+    if url not in snapshots:
+        return None
+    return json.loads(snapshots[url][0]), False
+
+def summarizeOnce(
+    url: str,
+    topK: int = 250,
+    onStage: Optional[Callable[[str], Awaitable[None]]] = None,
+    onPartial: Optional[Callable[[dict], Awaitable[None]]] = None
+):
+    # One job per URL and topK in this process, and one across processes through the lease.
+    # Callers joining a running job only get its final result, not its stages or partials.
+    key = f"summarize:{topK}:{url}"
+    return summarize_flights.do(key, lambda: summarize_leases.do(
+        key,
+        lambda: summarizeAndStore(url, topK, onStage=onStage, onPartial=onPartial),
+        lambda: storedSummary(url),
+        on_wait=(lambda: onStage("waiting")) if onStage else None
+    ))
+
+def refreshOnce(url: str, topK: int = 250):
+    started = datetime.utcnow()
+
+    async def refreshedElsewhere():
+        async with AsyncSessionLocal() as db:
+            video = await async_crud.get_video_by_url(db, url=url)
+        if video is not None and video.refreshed_at and video.refreshed_at >= started:
+            return {"mode": "shared", "refreshed_at": video.refreshed_at.isoformat()}, False
+        return None
+
+    key = f"refresh:{url}"
+    return summarize_flights.do(key, lambda: summarize_leases.do(
+        key, lambda: refreshVideo(url, topK), refreshedElsewhere
+    ))
+
+def videoColumns(video: models.Video) -> dict:
+    return {
+        "id": video.id,
+        "url": video.url,
+        "title": video.title,
+        "summary": video.summary
     }
 
+async def loadSnapshots(db: AsyncSession, urls: List[str]) -> Dict[str, tuple]:
+    snapshots = {url: (snapshot, etag) for url, snapshot, etag in await async_crud.get_video_snapshots(db, urls)}
+    # Videos stored before snapshots existed, or whose comments changed since
+    stale = [url for url, (snapshot, _) in snapshots.items() if snapshot is None]
+    if stale:
+        for url, snapshot, etag in await async_crud.refresh_video_snapshots(db, stale):
+            snapshots[url] = (snapshot, etag)
+    return snapshots
+
+def snapshotBody(fragments: Dict[str, str]) -> str:
+    # Splices already-encoded JSON values into one object without decoding them
+    return "{" + ",".join(encode(url) + ":" + fragment for url, fragment in fragments.items()) + "}"
+
+def etagMatches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+########## Summarize Jobs #############
+async def updateSummarizeJob(job_id: str, **fields):
+    async with AsyncSessionLocal() as db:
+        with span("db_update_job"):
+            await async_crud.update_summarize_job(db, job_id, **fields)
+
+async def runSummarizeJob(job_id: str):
+    # Every worker sharing video.db may have the job queued, only the one holding its lease runs it
+    async with summarize_leases.hold(f"job:{job_id}") as claimed:
+        if claimed:
+            await runClaimedSummarizeJob(job_id)
+
+async def runClaimedSummarizeJob(job_id: str):
+    async with AsyncSessionLocal() as db:
+        job = await async_crud.get_summarize_job(db, job_id=job_id)
+    # Finished by another worker before we claimed it
+    if job is None or job.status not in ("queued", "running"):
+        return
+    urls, topK = json.loads(job.urls), job.top_k
+
+    progress = {url: "queued" for url in urls}
+    # Serializes progress writes so an older snapshot never lands after a newer one
+    progress_lock = asyncio.Lock()
+
+    async def setStage(url: str, stage: str):
+        async with progress_lock:
+            progress[url] = stage
+            await updateSummarizeJob(job_id, stage=stage, progress=json.dumps(progress))
+
     try:
-        response = requests.get(url, headers=headers, data=payload)
-        response.raise_for_status()  # Raise an HTTPError for bad responses)
-        data_json = response.json()
+        await updateSummarizeJob(job_id, status="running", stage="lookup")
+
+        async with AsyncSessionLocal() as db:
+            results = {url: json.loads(snapshot) for url, (snapshot, _) in (await loadSnapshots(db, urls)).items()}
+        misses = [url for url in urls if url not in results]
+        for url in results:
+            progress[url] = "done"
+
+        outcomes = await asyncio.gather(*[
+            summarizeOnce(url, topK, onStage=lambda stage, url=url: setStage(url, stage))
+            for url in misses
+        ])
+
+        failed = 0
+        for url, (data, err) in zip(misses, outcomes):
+            results[url] = {"Error": data["Error"]} if err else data
+            progress[url] = "failed" if err else "done"
+            failed += bool(err)
+
+        await updateSummarizeJob(
+            job_id,
+            status="failed" if failed else "done",
+            stage="done",
+            progress=json.dumps(progress),
+            result=json.dumps({"results": results}),
+            error=f"{failed} of {len(urls)} videos failed" if failed else None
+        )
+    except Exception as e:
+        await updateSummarizeJob(job_id, status="failed", error=str(e))
+        raise
+
+async def resumeSummarizeJobs():
+    # Jobs persist in SQLite, so work queued before a restart, or held by a worker
+    # that died since, is picked up again. Jobs a live worker holds are left alone.
+    async with AsyncSessionLocal() as db:
+        jobs = await async_crud.get_unfinished_summarize_jobs(db)
+    for job in jobs:
+        if job.id in summarize_jobs or await summarize_leases.held(f"job:{job.id}"):
+            continue
+        if not summarize_jobs.submit(job.id):
+            print(f"Summarize job queue full, leaving {job.id} for a later round")
+            return
+
+async def resumeSummarizeJobsPeriodically(interval: float):
+    # Expired job leases only show up after their owner died, so look again every lease period
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await resumeSummarizeJobs()
+        except Exception as e:
+            print(f"Error in resumeSummarizeJobsPeriodically: {e}")
+
+summarize_jobs = JobQueue(
+    runSummarizeJob,
+    workers=int(os.getenv("SUMMARIZE_JOB_WORKERS", 2)),
+    max_size=int(os.getenv("SUMMARIZE_JOB_QUEUE_SIZE", 100))
+)
+
+def categoryRows(comment_summaries: dict) -> List[schemas.VideoCategoryCreate]:
+    return [
+        schemas.VideoCategoryCreate(
+            comment_category=comment_category,
+            summary=comment_summary["summary"],
+            category_count=comment_summary["categoryCount"],
+            comment_insights=json.dumps(comment_summary.get("commentInsights", [''])),
+            representative_comments=json.dumps(comment_summary.get("representativeComments", [''])),
+        )
+        for comment_category, comment_summary in comment_summaries.items()
+    ]
+
+def rawCommentRows(comments: List[dict]) -> List[schemas.RawCommentCreate]:
+    return [
+        schemas.RawCommentCreate(
+            cid=comment["cid"],
+            title=comment["title"],
+            text=comment["text"],
+            likes=comment["likes"],
+            create_time=comment["create_time"]
+        )
+        for comment in comments
+    ]
+
+async def storeSummary(url: str, title: str, comment_summaries: dict, scraped: Optional[dict] = None):
+    scraped = scraped or {}
+    async with AsyncSessionLocal() as db:
+        # Another request may have stored this URL while we were summarizing
+        if await async_crud.get_video_by_url(db, url=url) is None:
+            with span("db_store_summary", url=url):
+                try:
+                    await async_crud.create_video_with_comments(db, schemas.VideoWithCommentsCreate(
+                        url=url,
+                        title=title,
+                        summary="",
+                        comments=categoryRows(comment_summaries),
+                        raw_comments=rawCommentRows(scraped.get("comments", [])),
+                        comments_watermark=scraped.get("watermark", 0)
+                    ))
+                except IntegrityError:
+                    # Only possible when our lease expired mid-job and another worker stored it first
+                    await db.rollback()
+                    print(f"{url} was stored by another worker")
+
+async def summarizeAndStore(
+    url: str,
+    topK: int = 250,
+    onStage: Optional[Callable[[str], Awaitable[None]]] = None,
+    onPartial: Optional[Callable[[dict], Awaitable[None]]] = None
+):
+    async with summarize_slots:
+        data, err = await summarize_comments_helper(
+            retries=3, scrapeCount=50, videoURLS=VideoURLS(URLS=[url], topK=topK), onStage=onStage, onPartial=onPartial)
+    if err:
+        return data, True
+
+    comment_summaries = data["results"][url]['categories']
+    title = data["results"][url]['title']
+
+    if onStage:
+        await onStage("store")
+    await storeSummary(url, title, comment_summaries, data["scraped"][url])
+    # A disabled summarizer's workers could not load the model, new jobs would only fail
+    if VIDEO_SUMMARIES and not video_summarizer.disabled and not video_summary_jobs.submit(url):
+        print(f"Video summary queue full, skipping {url}")
+
+    return {
+        "video_summary": "",
+        "title": title,
+        "categories": comment_summaries
+    }, False
+
+########## Video Summaries #############
+# "auto" summarizes videos only when the LLaVA-NeXT-Video weights are downloaded
+VIDEO_SUMMARY = os.getenv("VIDEO_SUMMARY", "auto")
+VIDEO_SUMMARIES = VIDEO_SUMMARY == "1" or (VIDEO_SUMMARY == "auto" and video_model_available())
+video_summarizer = VideoSummarizerPool()
+
+async def summarizeVideo(url: str):
+    aweme_id = re.search(r"video\/([0-9]*)", url)
+    if aweme_id is None:
+        return
+
+    scraper = get_scraper()
+    item = await scraper.get_video_item(aweme_id.group(1))
+    video_url = item["video"].get("downloadAddr") or item["video"].get("playAddr")
+    if not video_url:
+        print(f"No playable address for {url}")
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "video.mp4")
+        with span("video_download"):
+            await scraper.download(video_url, path)
+        # Decoding, frame sampling and inference run in the worker processes
+        with span("video_summary"):
+            summary = await video_summarizer.summarize_file(path)
+
+    if not summary:
+        return
+    async with AsyncSessionLocal() as db:
+        video = await async_crud.get_video_by_url(db, url=url)
+        if video is not None:
+            with span("db_update_video_summary", url=url):
+                await async_crud.update_video_summary(db, video.id, summary)
+
+video_summary_jobs = JobQueue(
+    summarizeVideo,
+    workers=video_summarizer.workers,
+    max_size=int(os.getenv("VIDEO_SUMMARY_QUEUE_SIZE", 100))
+)
+
+########## Refresh #############
+REFRESH_MIN_DELTA = int(os.getenv("REFRESH_MIN_DELTA", 25))
+REFRESH_DRIFT_THRESHOLD = float(os.getenv("REFRESH_DRIFT_THRESHOLD", 0.5))
+
+async def refreshVideo(url: str, topK: int = 250):
+    async with AsyncSessionLocal() as db:
+        video = await async_crud.get_video_by_url(db, url=url)
+    if video is None:
+        return {"Error": f"{url} has not been summarized yet"}, True
+
+    new_comments, watermark = await scrapeNewComments(url, video.comments_watermark or 0)
+    if new_comments is None:
+        return {"Error": "Invalid video link"}, True
+
+    async with AsyncSessionLocal() as db:
+        with span("db_add_raw_comments", url=url):
+            await async_crud.add_raw_comments(db, video.id, rawCommentRows(new_comments), watermark)
+        # Includes new comments from earlier refreshes that were too few to summarize
+        pending = await async_crud.get_unsummarized_raw_comments(db, video.id)
+
+    if not pending:
+        return {"mode": "none", "new_comments": len(new_comments), "pending": 0}, False
+
+    # Drift: comments merged in as deltas since the last full summary, relative to its size
+    drift = ((video.drift_count or 0) + len(pending)) / max(video.summarized_count or 0, 1)
+    if drift > REFRESH_DRIFT_THRESHOLD:
+        mode = "full"
+        async with AsyncSessionLocal() as db:
+            comments = await async_crud.get_top_raw_comments(db, video.id, limit=topK)
+    elif len(pending) >= REFRESH_MIN_DELTA:
+        mode = "delta"
+        comments = pending
+    else:
+        return {"mode": "none", "new_comments": len(new_comments), "pending": len(pending)}, False
+
+    async with summarize_slots:
+        summary = await summarizeComments([
+            {"title": comment.title, "text": comment.text, "likes": comment.likes} for comment in comments
+        ])
+
+    async with AsyncSessionLocal() as db:
+        if mode == "delta":
+            stored = (await async_crud.get_videos_by_urls(db, [url]))[0]
+            summary = merge_comment_categories([serialize_video(stored), summary])
+        with span("db_update_categories", url=url):
+            await async_crud.update_video_categories(
+                db,
+                video.id,
+                categoryRows(summary["categories"]),
+                summarized_through=max(comment.id for comment in pending),
+                comment_count=len(comments) if mode == "full" else len(pending),
+                full=mode == "full"
+            )
+
+    return {"mode": mode, "new_comments": len(new_comments), "summarized": len(comments)}, False
+
+########## Scrape Comments #############
+async def scrapeHandler(
+    awemeID: str, scrapeCount: int, curr: int
+) -> tuple[list[str], bool, Optional[ScrapeError]]:
+    try:
+        with span("scrape_page"):
+            data_json = await get_scraper().get_comment_page(awemeID, scrapeCount, curr)
 
         # Check if the necessary keys are in the response
         if data_json and "comments" in data_json and "has_more" in data_json:
-            data = [{"title": comment["share_info"]["title"] ,"text": comment["text"], "likes": comment["digg_count"]} for comment in data_json["comments"] if comment.get("comment_language") == "en"]
+            data = [
+                {
+                    "cid": comment["cid"],
+                    "title": comment["share_info"]["title"],
+                    "text": comment["text"],
+                    "likes": comment["digg_count"],
+                    "create_time": comment.get("create_time", 0)
+                }
+                for comment in data_json["comments"] if comment.get("comment_language") == "en"
+            ]
             has_more = bool(data_json["has_more"])
-            return data, has_more, False
+            SCRAPE_PAGES.labels("ok").inc()
+            return data, has_more, None
         else:
             print(f"Unexpected response format: {data_json}")
-            # Write the response to a file for debugging
-            return None, False, True
+            SCRAPE_PAGES.labels("malformed").inc()
+            return None, False, ScrapeError("malformed", "Missing comments or has_more")
 
+    except ScrapeError as e:
+        print(f"Error in scrapeHandler ({e.kind}): {e}")
+        SCRAPE_PAGES.labels(e.kind).inc()
+        return None, False, e
     except Exception as e:
         print(f"Error in scrapeHandler: {e}")
-        return None, False, True
+        SCRAPE_PAGES.labels("malformed").inc()
+        return None, False, ScrapeError("malformed", str(e))
+
+SCRAPER_BACKOFF_BASE = float(os.getenv("SCRAPER_BACKOFF_BASE", 0.5))
+SCRAPER_BACKOFF_CAP = float(os.getenv("SCRAPER_BACKOFF_CAP", 30.0))
+
+async def scrapePage(
+    awemeID: str, scrapeCount: int, curr: int, retryCount: int
+) -> tuple[list[str], bool, bool]:
+    for retry in range(retryCount):
+        data, has_more, err = await scrapeHandler(awemeID, scrapeCount, curr)
+        if not err:
+            return data, has_more, False
+        if not err.retryable or retry + 1 == retryCount:
+            break
+        # Backing off (and honouring Retry-After) keeps concurrent jobs from a retry storm
+        delay = backoff_delay(retry, SCRAPER_BACKOFF_BASE, SCRAPER_BACKOFF_CAP, err.retry_after)
+        print(f"Retry {retry + 1}/{retryCount} for cursor {curr} of video {awemeID} in {delay:.2f}s ({err.kind})")
+        await asyncio.sleep(delay)
+    return None, False, True
+
+async def iterCommentPages(
+    awemeID: str, scrapeCount: int, retryCount: int, prefetch: int = 1
+) -> AsyncIterator[List[dict]]:
+    curr = 0
+    next_cursor = 0
+    # Cursors step by scrapeCount, so keep a window of `prefetch` pages in flight
+    # and yield them in cursor order. prefetch=1 walks the pages sequentially.
+    in_flight: Dict[int, asyncio.Task] = {}
+
+    try:
+        while True:
+            while len(in_flight) < max(prefetch, 1):
+                in_flight[next_cursor] = asyncio.create_task(
+                    scrapePage(awemeID, scrapeCount, next_cursor, retryCount)
+                )
+                next_cursor += scrapeCount
+
+            data, has_more, err = await in_flight.pop(curr)
+            if err:
+                print(f"Giving up on video {awemeID} at cursor {curr}")
+                return
+
+            yield data
+            if not has_more:
+                return
+            curr += scrapeCount
+    finally:
+        # Drop pages fetched past the last one (or past an early stop)
+        for task in in_flight.values():
+            task.cancel()
+        await asyncio.gather(*in_flight.values(), return_exceptions=True)
 
-def scrapeManager(
-    videoLink: str, scrapeCount: int, retryCount: int
+async def scrapeManager(
+    videoLink: str,
+    scrapeCount: int,
+    retryCount: int,
+    prefetch: int = 1,
+    topK: int = 250,
+    earlyStopPages: int = 0,
 ) -> Dict[str, List[str]]:
     aweme_id = re.search(r"video\/([0-9]*)", videoLink)
     if aweme_id is None:
@@ -262,55 +999,128 @@ def scrapeManager(
         return {videoLink: {"comments": [], "comment_count": 0, "Error": "Invalid video link"}}
 
     aweme_id = aweme_id.group(1)
-    comments = []
-    retries = 0
-    curr = 0
-    has_more = True
+    # Only the topK most liked comments are kept, memory does not grow with the comment count
+    top_comments = TopKComments(topK)
+    stale_pages = 0
+    # Newest comment seen, later refreshes only need comments after it
+    watermark = 0
 
-    while has_more and retries < retryCount:
-        data, has_more, err = scrapeHandler(aweme_id, scrapeCount, curr)
-        if err:
-            print(f"Retry {retries + 1}/{retryCount} for video {videoLink}")
-            retries += 1
-            continue
-        else:
-            comments.extend(data)
-            curr += scrapeCount
-            retries = 0
+    async with aclosing(iterCommentPages(aweme_id, scrapeCount, retryCount, prefetch)) as pages:
+        async for page in pages:
+            improved = False
+            for comment in page:
+                improved = top_comments.push(comment) or improved
+                watermark = max(watermark, comment["create_time"])
+
+            # Early stop once the heap is full and `earlyStopPages` pages in a row
+            # could not beat its like threshold (0 disables the policy)
+            stale_pages = 0 if improved or not top_comments.full else stale_pages + 1
+            if earlyStopPages and stale_pages >= earlyStopPages:
+                print(f"Early stop for video {videoLink} after {top_comments.seen} comments")
+                break
+
+    sorted_comments = top_comments.sorted()
+
+    return {videoLink: {"comments": sorted_comments, "comment_count": len(sorted_comments), "watermark": watermark}}
+
+async def scrapeNewComments(
+    videoLink: str,
+    watermark: int,
+    scrapeCount: int = 50,
+    retryCount: int = 3,
+    prefetch: int = int(os.getenv("SCRAPER_PREFETCH", 4)),
+    maxPages: int = int(os.getenv("REFRESH_MAX_PAGES", 20)),
+    stalePages: int = int(os.getenv("REFRESH_STALE_PAGES", 2)),
+):
+    """
+    Comments posted after `watermark`, and the new watermark. TikTok cannot list
+    comments by time, so pages are walked until `stalePages` pages in a row hold
+    nothing newer than the watermark, or `maxPages` pages were read.
+    """
+    aweme_id = re.search(r"video\/([0-9]*)", videoLink)
+    if aweme_id is None:
+        return None, watermark
+
+    new_comments = []
+    newest = watermark
+    stale = 0
+    async with aclosing(iterCommentPages(aweme_id.group(1), scrapeCount, retryCount, prefetch)) as pages:
+        page_count = 0
+        async for page in pages:
+            page_count += 1
+            fresh = [comment for comment in page if comment["create_time"] > watermark]
+            new_comments.extend(fresh)
+            newest = max([newest] + [comment["create_time"] for comment in fresh])
+            stale = 0 if fresh else stale + 1
+            if stale >= stalePages or page_count >= maxPages:
+                break
+
+    return new_comments, newest
+
+COMMENT_DEDUP = os.getenv("COMMENT_DEDUP", "1") != "0"
 
-    # Sort comments by digg_count in descending order and take the top 100
-    sorted_comments = sorted(comments, key=lambda x: x["likes"], reverse=True)[:250]
+async def summarizeComments(comments: List[dict], onPartial: Optional[Callable[[dict], Awaitable[None]]] = None) -> dict:
+    # Only what the prompt needs, ids and timestamps would just cost tokens
+    comments = [{"title": comment["title"], "text": comment["text"], "likes": comment["likes"]} for comment in comments]
+    record_comments("scraped", len(comments))
+    # MinHash and tokenizing up to topK comments take seconds, so both run in
+    # one thread instead of on the event loop
+    comments, packs = await asyncio.to_thread(prepareComments, comments)
+    record_comments("summarized", len(comments))
+    with model_registry.first_call("comment_summary"), span("comment_summary", comments=len(comments)):
+        if onPartial is None:
+            return await get_comment_summary().asummarize_packed(packs)
+        summary = None
+        async for summary in get_comment_summary().astream_packed(packs):
+            await onPartial(summary)
+        return summary
 
-    return {videoLink: {"comments": sorted_comments, "comment_count": len(sorted_comments)}}
+def prepareComments(comments: List[dict]):
+    if COMMENT_DEDUP:
+        # Near-duplicates are sent once with a multiplicity count
+        with span("dedup"):
+            comments = collapse_near_duplicates(comments)
+    return comments, get_comment_summary().prepare(comments)
 
-def summarize_comments_helper(
+async def summarize_comments_helper(
     videoURLS: VideoURLS,
-    threads: int = 100, 
     retries: int = 3, 
     scrapeCount: int = 50, 
+    prefetch: int = int(os.getenv("SCRAPER_PREFETCH", 4)),
+    earlyStopPages: int = int(os.getenv("SCRAPER_EARLY_STOP_PAGES", 0)),
+    onStage: Optional[Callable[[str], Awaitable[None]]] = None,
+    onPartial: Optional[Callable[[dict], Awaitable[None]]] = None,
     ) -> JSONResponse:
 
-    commentsummarizer: CommentSummary = CommentSummary()
-
     if not videoURLS.URLS or len(videoURLS.URLS) == 0:
         return ({"Error": "videoURLS cannot be empty"}, True)
 
     results: dict = {}
     summaries: dict = {}
 
-    with ThreadPoolExecutor(max_workers=threads) as executor:
-        futures = [
-            executor.submit(scrapeManager, link, scrapeCount, retries)
-            for link in videoURLS.URLS
-        ]
+    if onStage:
+        await onStage("scrape")
+
+    # Scrape every URL concurrently on the event loop, sharing the pooled client
+    scraped = await asyncio.gather(*[
+        scrapeManager(link, scrapeCount, retries, prefetch, videoURLS.topK, earlyStopPages)
+        for link in videoURLS.URLS
+    ])
+
+    for result in scraped:
+        results.update(result)
+
+    for key, value in results.items():
+        if value.get("Error") or not value["comments"]:
+            return ({"Error": value.get("Error", f"No comments found for {key}")}, True)
 
-        for future in futures:
-            result: Dict[str, List[str]] = future.result()
-            results.update(result)
+    if onStage:
+        await onStage("summarize")
 
     for key, value in results.items():
-        summaries[key] = commentsummarizer.get_comments_summary(value["comments"])
+        summaries[key] = await summarizeComments(value["comments"], onPartial=onPartial)
         # Add title
         summaries[key]["title"] = value["comments"][0]["title"]
         
-    return ({"results": summaries}, False)
\ No newline at end of file
+    # Raw comments go along so they can be stored for later refreshes
+    return ({"results": summaries, "scraped": results}, False)
\ No newline at end of file
@@ -0,0 +1,8 @@
+from .metrics import (
+    record_comments,
+    register_gauge,
+    render_metrics,
+    span,
+    SCRAPE_PAGES,
+)
+from .profiling import PROFILING_ENABLED, profile_request
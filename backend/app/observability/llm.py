@@ -0,0 +1,62 @@
+"""
+LangChain hooks for the metrics in `metrics`, kept apart so that only the
+model modules, not every importer of `observability`, load LangChain.
+"""
+from typing import Any, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from ..ai_models.tokenizer import count_tokens
+from .metrics import LLM_TOKENS, span
+
+
+def timed_runnable(stage: str, runnable: Runnable) -> Runnable:
+    """Wraps a runnable so each invocation is recorded as a span, e.g. output parsing."""
+    def invoke(value):
+        with span(stage):
+            return runnable.invoke(value)
+
+    async def ainvoke(value):
+        with span(stage):
+            return await runnable.ainvoke(value)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=stage)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    Records prompt and response tokens of every LLM call into tiktok_llm_tokens.
+    Provider usage metadata is used when present, otherwise the local estimate.
+    """
+
+    def __init__(self, caller: str):
+        self.caller = caller
+        self._prompt_tokens: Dict[UUID, int] = {}
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        self._prompt_tokens[run_id] = sum(count_tokens(prompt) for prompt in prompts)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[list], *, run_id: UUID, **kwargs: Any):
+        self._prompt_tokens[run_id] = sum(
+            count_tokens(str(message.content)) for batch in messages for message in batch
+        )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        prompt_tokens = self._prompt_tokens.pop(run_id, 0)
+        response_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt_tokens = usage.get("input_tokens", prompt_tokens)
+                    response_tokens += usage.get("output_tokens", 0)
+                else:
+                    response_tokens += count_tokens(generation.text)
+        LLM_TOKENS.labels(self.caller, "prompt").observe(prompt_tokens)
+        LLM_TOKENS.labels(self.caller, "response").observe(response_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._prompt_tokens.pop(run_id, None)
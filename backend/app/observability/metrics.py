@@ -0,0 +1,65 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Scrape pages take tens of milliseconds, LLM calls tens of seconds
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+STAGE_SECONDS = Histogram(
+    "tiktok_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=STAGE_BUCKETS
+)
+STAGE_ERRORS = Counter(
+    "tiktok_stage_errors_total", "Pipeline stages that raised", ["stage"]
+)
+LLM_TOKENS = Histogram(
+    "tiktok_llm_tokens", "Tokens per LLM call", ["caller", "kind"], buckets=TOKEN_BUCKETS
+)
+COMMENTS = Histogram(
+    "tiktok_comments", "Comments handled per summarization", ["kind"], buckets=COUNT_BUCKETS
+)
+SCRAPE_PAGES = Counter(
+    "tiktok_scrape_pages_total", "Comment pages requested, by outcome", ["outcome"]
+)
+
+LOG_SPANS = os.getenv("METRICS_LOG_SPANS", "0") != "0"
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """
+    Times the block into tiktok_stage_seconds{stage}. Exceptions are counted and
+    re-raised. With METRICS_LOG_SPANS=1 each span is also printed as a JSON line.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        yield fields
+    except BaseException as e:
+        error = type(e).__name__
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        if LOG_SPANS:
+            print(json.dumps({"span": stage, "seconds": round(elapsed, 6), "error": error, **fields}, default=str))
+
+
+def record_comments(kind: str, count: int):
+    COMMENTS.labels(kind).observe(count)
+
+
+def register_gauge(name: str, description: str, read):
+    """Gauge whose value is read when /metrics is scraped, e.g. limiter state."""
+    gauge = Gauge(name, description)
+    gauge.set_function(read)
+    return gauge
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
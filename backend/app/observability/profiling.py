@@ -0,0 +1,46 @@
+import cProfile
+import os
+import re
+import threading
+import time
+
+from fastapi import Request
+
+PROFILE_HEADER = "X-Profile"
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") != "0"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# cProfile hooks the whole interpreter, so only one request is profiled at a time
+_profile_lock = threading.Lock()
+
+
+async def profile_request(request: Request, call_next):
+    """
+    Middleware: with PROFILING_ENABLED=1, a request carrying `X-Profile: 1` is run
+    under cProfile and the stats are written to PROFILE_DIR, named in the
+    X-Profile-File response header. Other tasks running on the event loop at the
+    same time show up in the profile too. Streamed bodies are not covered.
+    """
+    if not PROFILING_ENABLED or request.headers.get(PROFILE_HEADER) != "1":
+        return await call_next(request)
+    if not _profile_lock.acquire(blocking=False):
+        response = await call_next(request)
+        response.headers[PROFILE_HEADER] = "busy"
+        return response
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{time.monotonic_ns() % 10**6}.prof")
+    profiler.dump_stats(path)
+    response.headers["X-Profile-File"] = path
+    return response
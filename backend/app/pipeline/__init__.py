@@ -0,0 +1,3 @@
+from .single_flight import SingleFlight
+from .jobs import JobQueue
+from .lease_flight import LeaseFlight
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set
+
+
+class JobQueue:
+    """
+    Bounded in-process queue of job ids served by a fixed pool of asyncio workers.
+
+    `submit` never blocks: it returns False when the queue is full so callers can
+    push back on clients instead of piling up work. Job state lives wherever the
+    handler keeps it, the queue only schedules ids.
+    """
+
+    def __init__(self, handler: Callable[[str], Awaitable[None]], workers: int = 2, max_size: int = 100):
+        self.handler = handler
+        self.workers = workers
+        self.max_size = max_size
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[str] = set()  # Submitted and not finished yet
+        self._tasks: List[asyncio.Task] = []
+        self.running = 0
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def full(self) -> bool:
+        return self._queue is None or self._queue.full()
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._pending
+
+    def submit(self, job_id: str) -> bool:
+        if self.full():
+            self.rejected += 1
+            return False
+        self._queue.put_nowait(job_id)
+        self._pending.add(job_id)
+        self.submitted += 1
+        return True
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self.running += 1
+            try:
+                await self.handler(job_id)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error in job {job_id}: {e}")
+            finally:
+                self.running -= 1
+                self._pending.discard(job_id)
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_size": self.max_size,
+            "depth": self.depth,
+            "running": self.running,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from ..sql_app import async_crud
+
+T = TypeVar("T")
+
+
+class LeaseFlight:
+    """
+    SingleFlight across processes: at most one worker sharing video.db runs the
+    job for a key at a time, coordinated through rows in `scrape_leases`.
+
+    A worker claims the key before running the job and renews the claim every
+    ttl / 3 seconds while it runs. Everyone else polls until the claim is gone,
+    then reads the stored result. A crashed worker stops renewing, so its claim
+    expires after `ttl` and the next worker to poll takes over.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        ttl: float = float(os.getenv("SCRAPE_LEASE_TTL", 60)),
+        poll_interval: float = float(os.getenv("SCRAPE_LEASE_POLL", 0.5)),
+        owner: Optional[str] = None,
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self.acquired = 0
+        self.waited = 0
+        self.shared = 0
+        self.lost = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        stored: Callable[[], Awaitable[Optional[T]]],
+        on_wait: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> T:
+        """
+        `stored()` when another worker already produced the result, otherwise
+        `fn()` under the lease. If the holder fails without storing a result,
+        a waiting worker claims the key and runs `fn` itself.
+        """
+        while True:
+            async with self.hold(key) as acquired:
+                if acquired:
+                    # The previous holder may have finished between our lookup and the claim
+                    result = await stored()
+                    return result if result is not None else await fn()
+
+            self.waited += 1
+            if on_wait:
+                await on_wait()
+            await self._wait(key)
+            result = await stored()
+            if result is not None:
+                self.shared += 1
+                return result
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        """
+        Claims `key` without waiting and yields whether that worked. A claimed
+        key is renewed while the block runs and released when it exits.
+        """
+        async with self.session_factory() as db:
+            acquired = await async_crud.acquire_lease(db, key, self.owner, self.ttl)
+        if not acquired:
+            yield False
+            return
+
+        self.acquired += 1
+        heartbeat = asyncio.create_task(self._renew(key))
+        try:
+            yield True
+        finally:
+            heartbeat.cancel()
+            async with self.session_factory() as db:
+                await async_crud.release_lease(db, key, self.owner)
+
+    async def held(self, key: str) -> bool:
+        """Whether a live worker holds `key` right now."""
+        async with self.session_factory() as db:
+            lease = await async_crud.get_lease(db, key)
+        return lease is not None and lease.expires_at >= datetime.utcnow()
+
+    async def _renew(self, key: str):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            async with self.session_factory() as db:
+                if not await async_crud.renew_lease(db, key, self.owner, self.ttl):
+                    # Reclaimed after a stall, the job keeps going but may now run twice
+                    self.lost += 1
+                    print(f"Lost lease on {key}")
+                    return
+
+    async def _wait(self, key: str):
+        while await self.held(key):
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        return {
+            "owner": self.owner,
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "shared": self.shared,
+            "lost": self.lost,
+        }
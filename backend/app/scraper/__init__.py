@@ -0,0 +1,3 @@
+from .rate_limit import AIMDLimiter, ScrapeError, TokenBucket, backoff_delay
+from .tiktok_scraper import TikTokScraper, get_scraper, close_scraper
+from .top_k import TopKComments
@@ -0,0 +1,155 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class ScrapeError(Exception):
+    """
+    A failed page request, classified so callers can decide whether and when to retry.
+
+    kind is one of "throttled" (429), "server" (5xx), "network" (timeouts and
+    connection errors), "malformed" (unexpected or empty payload) or "client"
+    (any other 4xx, not retried).
+    """
+
+    RETRYABLE = {"throttled", "server", "network", "malformed"}
+
+    def __init__(self, kind: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in self.RETRYABLE
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given as seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, retry_after: Optional[float] = None) -> float:
+    """
+    Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)].
+    A server supplied Retry-After is a floor, jitter is added on top of it so that
+    clients told the same delay do not all come back at once. It is clamped to
+    `cap` too, a buggy or hostile Retry-After must not stall a scrape for hours.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = min(cap, retry_after) + random.uniform(0, base)
+    return delay
+
+
+class TokenBucket:
+    """Smooths the request rate to `rate` per second, allowing bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def stats(self) -> dict:
+        self._refill()
+        return {"rate": self.rate, "burst": self.burst, "tokens": round(self._tokens, 2)}
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit that grows by one request per window of successes and is
+    multiplied by `decrease` on a 429 or when latency exceeds `latency_target`.
+
+    Decreases are applied at most once per `cooldown` seconds, so a burst of 429s
+    from requests that were already in flight counts as a single signal.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 32,
+        decrease: float = 0.5,
+        latency_target: float = 2.0,
+        cooldown: float = 1.0,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self.throttled = 0
+        self.slow = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self._last_decrease = now
+
+    def on_success(self, latency: float):
+        if self.latency_target and latency > self.latency_target:
+            self.slow += 1
+            self._decrease()
+        else:
+            # +1 per `limit` successes, i.e. about one request per round trip
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self):
+        self.throttled += 1
+        self._decrease()
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "throttled": self.throttled,
+            "slow": self.slow,
+        }
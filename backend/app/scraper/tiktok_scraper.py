@@ -0,0 +1,203 @@
+import asyncio
+import importlib.util
+import os
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .rate_limit import AIMDLimiter, ScrapeError, TokenBucket, parse_retry_after
+
+TIKTOK_COMMENT_API = "https://www.tiktok.com/api/comment/list/"
+TIKTOK_ITEM_API = "https://www.tiktok.com/api/item/detail/"
+
+# Built once and shared by every request made through the client
+DEFAULT_HEADERS = {
+    "accept": "*/*",
+    "accept-language": "en-US,en;q=0.9",
+    "dnt": "1",
+    "priority": "u=1, i",
+    "sec-ch-ua": '"Not/A)Brand";v="8", "Chromium";v="126"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"macOS"',
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+}
+
+
+class TikTokScraper:
+    """
+    Async HTTP engine for the TikTok comment API.
+
+    A single keep-alive httpx client (HTTP/2 when `h2` is installed) is shared by
+    every page request, so connections are reused instead of paying a new TCP+TLS
+    handshake per page. Requests to the same host are capped by a semaphore.
+
+    Every request also takes a token from a shared bucket (steady request rate)
+    and a slot from an AIMD limiter that backs off on 429s, 5xx and slow responses.
+    Failures are raised as ScrapeError with a kind telling them apart.
+
+    Video downloads stream for much longer than a page request, so they are
+    capped by their own semaphore and leave the limiter and host slots alone.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        per_host_limit: int = 10,
+        timeout: float = 10.0,
+        http2: bool = True,
+        rate: float = 20.0,
+        burst: int = 10,
+        limiter: Optional[AIMDLimiter] = None,
+        comment_api: str = TIKTOK_COMMENT_API,
+        download_limit: int = 2,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout)
+        # HTTP/2 needs the optional h2 package, fall back to HTTP/1.1 keep-alive without it
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.per_host_limit = per_host_limit
+        self.comment_api = comment_api
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = limiter or AIMDLimiter(maximum=per_host_limit)
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.download_limit = download_limit
+        self._downloads = asyncio.Semaphore(download_limit)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout,
+                headers=DEFAULT_HEADERS,
+            )
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def get_json(self, url: str, params: Optional[dict] = None):
+        async with self.limiter.slot(), self._host_semaphore(url):
+            await self.bucket.acquire()
+            started = time.monotonic()
+            try:
+                response = await self.client.get(url, params=params)
+            except httpx.TransportError as e:
+                raise ScrapeError("network", f"{type(e).__name__}: {e}") from e
+            latency = time.monotonic() - started
+
+            if response.status_code == 429:
+                self.limiter.on_throttle()
+                raise ScrapeError("throttled", "429 Too Many Requests",
+                                  retry_after=parse_retry_after(response.headers.get("retry-after")))
+            # A failing host is congested too, growing the limit would only add load
+            if response.status_code >= 500:
+                self.limiter.on_throttle()
+            elif response.status_code < 400:
+                self.limiter.on_success(latency)
+
+        if response.status_code >= 500:
+            raise ScrapeError("server", f"{response.status_code} from {url}",
+                              retry_after=parse_retry_after(response.headers.get("retry-after")))
+        if response.status_code >= 400:
+            raise ScrapeError("client", f"{response.status_code} from {url}")
+        try:
+            return response.json()
+        except ValueError as e:
+            # TikTok answers soft blocks with an empty 200
+            raise ScrapeError("malformed", f"Invalid JSON ({len(response.content)} bytes) from {url}") from e
+
+    async def get_comment_page(self, aweme_id: str, count: int, cursor: int):
+        params = {"aweme_id": aweme_id, "count": count, "cursor": cursor}
+        return await self.get_json(self.comment_api, params=params)
+
+    async def get_video_item(self, aweme_id: str) -> dict:
+        data = await self.get_json(TIKTOK_ITEM_API, params={"itemId": aweme_id})
+        try:
+            return data["itemInfo"]["itemStruct"]
+        except (KeyError, TypeError) as e:
+            raise ScrapeError("malformed", f"No item info for {aweme_id}") from e
+
+    async def download(self, url: str, path: str, max_bytes: int = 200 * 1024 * 1024):
+        """Stream `url` to `path` with the shared client, it carries the cookies TikTok's CDN expects."""
+        async with self._downloads:
+            await self.bucket.acquire()
+            try:
+                async with self.client.stream("GET", url, headers={"referer": "https://www.tiktok.com/"}) as response:
+                    if response.status_code >= 400:
+                        raise ScrapeError("throttled" if response.status_code == 429 else "client",
+                                          f"{response.status_code} downloading {url}")
+                    written = 0
+                    with open(path, "wb") as f:
+                        async for chunk in response.aiter_bytes():
+                            written += len(chunk)
+                            if written > max_bytes:
+                                raise ScrapeError("client", f"Video larger than {max_bytes} bytes")
+                            f.write(chunk)
+            except httpx.TransportError as e:
+                raise ScrapeError("network", f"{type(e).__name__}: {e}") from e
+
+    def stats(self) -> dict:
+        return {"rate_limit": self.bucket.stats(), "concurrency": self.limiter.stats()}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_semaphores.clear()
+        self._downloads = asyncio.Semaphore(self.download_limit)
+
+
+_scraper: Optional[TikTokScraper] = None
+
+
+def get_scraper() -> TikTokScraper:
+    """Process-wide scraper, configured from the environment on first use."""
+    global _scraper
+    if _scraper is None:
+        _scraper = TikTokScraper(
+            max_connections=int(os.getenv("SCRAPER_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(os.getenv("SCRAPER_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=float(os.getenv("SCRAPER_KEEPALIVE_EXPIRY", 30.0)),
+            per_host_limit=int(os.getenv("SCRAPER_PER_HOST_LIMIT", 10)),
+            timeout=float(os.getenv("SCRAPER_TIMEOUT", 10.0)),
+            http2=os.getenv("SCRAPER_HTTP2", "1") != "0",
+            rate=float(os.getenv("SCRAPER_RATE", 20.0)),
+            burst=int(os.getenv("SCRAPER_BURST", 10)),
+            limiter=AIMDLimiter(
+                initial=int(os.getenv("SCRAPER_INITIAL_CONCURRENCY", 4)),
+                minimum=int(os.getenv("SCRAPER_MIN_CONCURRENCY", 1)),
+                maximum=int(os.getenv("SCRAPER_PER_HOST_LIMIT", 10)),
+                latency_target=float(os.getenv("SCRAPER_LATENCY_TARGET", 2.0)),
+            ),
+            # Pointed at a local stand-in by the benchmarks
+            comment_api=os.getenv("TIKTOK_COMMENT_API", TIKTOK_COMMENT_API),
+            download_limit=int(os.getenv("SCRAPER_DOWNLOAD_CONCURRENCY", 2)),
+        )
+    return _scraper
+
+
+async def close_scraper():
+    global _scraper
+    if _scraper is not None:
+        await _scraper.aclose()
+        _scraper = None
@@ -0,0 +1,51 @@
+import heapq
+from typing import List, Optional
+
+
+class TopKComments:
+    """
+    Fixed-size min-heap keeping the K most liked comments seen so far.
+
+    Memory stays O(K) however many comments are pushed through it. Entries are
+    ordered by likes (TikTok's `digg_count`) and then by arrival, so ties keep the
+    earliest comment and comment dicts are never compared directly.
+    """
+
+    def __init__(self, k: int):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self.seen = 0
+        self._heap: list = []
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    @property
+    def full(self) -> bool:
+        return len(self._heap) >= self.k
+
+    @property
+    def threshold(self) -> Optional[int]:
+        """Likes a new comment must beat to enter the heap, None while not full."""
+        return self._heap[0][0] if self.full else None
+
+    def push(self, comment: dict) -> bool:
+        """Offer a comment, returns True if it is now part of the top K."""
+        self.seen += 1
+        # Negated sequence number so that, on equal likes, the newest entry is evicted first
+        entry = (comment["likes"], -self._seq, comment)
+        self._seq += 1
+
+        if not self.full:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def sorted(self) -> List[dict]:
+        """Top comments, most liked first."""
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
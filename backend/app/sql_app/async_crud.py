@@ -0,0 +1,315 @@
+"""
+CRUD for use on the event loop, backed by aiosqlite. The API and pipeline go
+through here, `crud` keeps the original sync functions and what sync code
+(chat history, embedding indexing) still needs.
+"""
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from . import models, schemas
+from .search import SEARCH_SQL, SNIPPETS_SQL
+from .crud import _notify_video_comments_changed
+from .snapshots import apply_snapshot
+
+# Video CRUD operations
+async def get_video(db: AsyncSession, video_id: int):
+    return await db.scalar(select(models.Video).filter(models.Video.id == video_id))
+
+async def get_videos(db: AsyncSession, after_id: int = 0, limit: int = 10):
+    return (await db.scalars(
+        select(models.Video).filter(models.Video.id > after_id).order_by(models.Video.id).limit(limit)
+    )).all()
+
+async def create_video(db: AsyncSession, video: schemas.VideoCreate):
+    db_video = models.Video(url=video.url, title=video.title, summary=video.summary)
+    apply_snapshot(db_video)
+    db.add(db_video)
+    await db.commit()
+    await db.refresh(db_video)
+    return db_video
+
+async def create_video_with_comments(db: AsyncSession, video: schemas.VideoWithCommentsCreate):
+    # The video and all of its categories are written in one transaction (one fsync)
+    db_video = models.Video(
+        url=video.url,
+        title=video.title,
+        summary=video.summary,
+        content_version=len(video.comments),
+        comments_watermark=video.comments_watermark,
+        summarized_count=len(video.raw_comments),
+        drift_count=0,
+        refreshed_at=datetime.utcnow()
+    )
+    db_video.comments = [
+        models.VideoComment(
+            comment_category=comment.comment_category,
+            summary=comment.summary,
+            category_count=comment.category_count,
+            comment_insights=comment.comment_insights,
+            representative_comments=comment.representative_comments
+        )
+        for comment in video.comments
+    ]
+    # The comments the categories were built from, kept for incremental refreshes
+    db_video.raw_comments = [
+        models.RawComment(**comment.model_dump(), summarized=True)
+        for comment in video.raw_comments
+    ]
+    apply_snapshot(db_video)
+    db.add(db_video)
+    await db.commit()
+    _notify_video_comments_changed(db_video.id)
+    return db_video
+
+# VideoComment CRUD operations
+async def get_video_by_url(db: AsyncSession, url: str):
+    return await db.scalar(select(models.Video).filter(models.Video.url == url))
+
+async def get_videos_by_urls(db: AsyncSession, urls: List[str]):
+    # Videos with their comment categories eagerly loaded, async sessions cannot lazy-load
+    return (await db.scalars(
+        select(models.Video)
+        .options(selectinload(models.Video.comments))
+        .filter(models.Video.url.in_(urls))
+    )).all()
+
+async def get_video_snapshots(db: AsyncSession, urls: List[str]):
+    # (url, snapshot, etag) rows only, without loading any comments
+    return (await db.execute(
+        select(models.Video.url, models.Video.snapshot, models.Video.etag)
+        .filter(models.Video.url.in_(urls))
+    )).all()
+
+async def refresh_video_snapshots(db: AsyncSession, urls: List[str]):
+    videos = await get_videos_by_urls(db, urls)
+    for video in videos:
+        apply_snapshot(video)
+    await db.commit()
+    return [(video.url, video.snapshot, video.etag) for video in videos]
+
+async def update_video_summary(db: AsyncSession, video_id: int, summary: str):
+    # Chat context and snapshots include the summary, so it counts as a content change
+    await db.execute(
+        update(models.Video)
+        .filter(models.Video.id == video_id)
+        .values(
+            summary=summary,
+            content_version=func.coalesce(models.Video.content_version, 0) + 1,
+            snapshot=None,
+            etag=None
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    _notify_video_comments_changed(video_id)
+
+async def search_videos(db: AsyncSession, query: str, after: Optional[Tuple[float, int]] = None, limit: int = 10):
+    after_score, after_id = after or (None, 0)
+    hits = (await db.execute(
+        SEARCH_SQL, {"query": query, "after_score": after_score, "after_id": after_id, "limit": limit}
+    )).all()
+    videos = {
+        video.id: video
+        for video in await db.scalars(select(models.Video).filter(models.Video.id.in_([hit.video_id for hit in hits])))
+    }
+    return [(videos[hit.video_id], hit.score) for hit in hits if hit.video_id in videos]
+
+async def get_search_snippets(db: AsyncSession, query: str, video_ids: List[int]):
+    if not video_ids:
+        return []
+    return (await db.execute(SNIPPETS_SQL, {"query": query, "video_ids": video_ids})).all()
+
+async def get_videos_due_for_refresh(db: AsyncSession, before: datetime, limit: int = 10):
+    return (await db.scalars(
+        select(models.Video)
+        .filter((models.Video.refreshed_at == None) | (models.Video.refreshed_at < before))
+        .order_by(models.Video.refreshed_at)
+        .limit(limit)
+    )).all()
+
+async def update_video_categories(
+    db: AsyncSession,
+    video_id: int,
+    categories: List[schemas.VideoCategoryCreate],
+    summarized_through: int,
+    comment_count: int,
+    full: bool
+):
+    await db.execute(delete(models.VideoComment).filter(models.VideoComment.video_id == video_id))
+    db.add_all([
+        models.VideoComment(video_id=video_id, **category.model_dump())
+        for category in categories
+    ])
+    await db.execute(
+        update(models.RawComment)
+        .filter(models.RawComment.video_id == video_id, models.RawComment.id <= summarized_through)
+        .values(summarized=True)
+    )
+    drift = dict(summarized_count=comment_count, drift_count=0) if full else \
+        dict(drift_count=func.coalesce(models.Video.drift_count, 0) + comment_count)
+    await db.execute(
+        update(models.Video)
+        .filter(models.Video.id == video_id)
+        .values(
+            content_version=func.coalesce(models.Video.content_version, 0) + 1,
+            snapshot=None,
+            etag=None,
+            **drift
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    _notify_video_comments_changed(video_id)
+
+async def get_comments_by_video_id(db: AsyncSession, video_id: int):
+    return (await db.scalars(select(models.VideoComment).filter(models.VideoComment.video_id == video_id))).all()
+
+# RawComment CRUD operations
+async def add_raw_comments(db: AsyncSession, video_id: int, comments: List[schemas.RawCommentCreate], watermark: int):
+    if comments:
+        await db.execute(
+            insert(models.RawComment)
+            .values([{"video_id": video_id, **comment.model_dump()} for comment in comments])
+            .on_conflict_do_nothing(index_elements=["video_id", "cid"])
+        )
+    await db.execute(
+        update(models.Video)
+        .filter(models.Video.id == video_id)
+        .values(
+            comments_watermark=func.max(func.coalesce(models.Video.comments_watermark, 0), watermark),
+            refreshed_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+async def get_unsummarized_raw_comments(db: AsyncSession, video_id: int):
+    return (await db.scalars(
+        select(models.RawComment)
+        .filter(models.RawComment.video_id == video_id, models.RawComment.summarized == False)
+        .order_by(models.RawComment.id)
+    )).all()
+
+async def get_top_raw_comments(db: AsyncSession, video_id: int, limit: int = 250):
+    return (await db.scalars(
+        select(models.RawComment)
+        .filter(models.RawComment.video_id == video_id)
+        .order_by(models.RawComment.likes.desc(), models.RawComment.id)
+        .limit(limit)
+    )).all()
+
+# SummarizeJob CRUD operations
+async def create_summarize_job(db: AsyncSession, job: schemas.SummarizeJobCreate):
+    db_job = models.SummarizeJob(
+        id=uuid.uuid4().hex,
+        status="queued",
+        stage="queued",
+        urls=json.dumps(job.urls),
+        top_k=job.top_k,
+        progress=json.dumps({url: "queued" for url in job.urls}),
+    )
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+async def get_summarize_job(db: AsyncSession, job_id: str):
+    return await db.scalar(select(models.SummarizeJob).filter(models.SummarizeJob.id == job_id))
+
+async def get_unfinished_summarize_jobs(db: AsyncSession):
+    return (await db.scalars(
+        select(models.SummarizeJob)
+        .filter(models.SummarizeJob.status.in_(["queued", "running"]))
+        .order_by(models.SummarizeJob.created_at)
+    )).all()
+
+async def update_summarize_job(db: AsyncSession, job_id: str, **fields):
+    await db.execute(update(models.SummarizeJob).filter(models.SummarizeJob.id == job_id).values(**fields))
+    await db.commit()
+
+# ScrapeLease CRUD operations
+async def acquire_lease(db: AsyncSession, key: str, owner: str, ttl: float) -> bool:
+    now = datetime.utcnow()
+    statement = (
+        insert(models.ScrapeLease)
+        .values(key=key, owner=owner, expires_at=now + timedelta(seconds=ttl), created_at=now)
+        .on_conflict_do_update(
+            index_elements=["key"],
+            set_={"owner": owner, "expires_at": now + timedelta(seconds=ttl), "created_at": now},
+            where=(models.ScrapeLease.expires_at < now) | (models.ScrapeLease.owner == owner),
+        )
+        .returning(models.ScrapeLease.key)
+    )
+    acquired = (await db.execute(statement)).first() is not None
+    await db.commit()
+    return acquired
+
+async def renew_lease(db: AsyncSession, key: str, owner: str, ttl: float) -> bool:
+    result = await db.execute(
+        update(models.ScrapeLease)
+        .filter(models.ScrapeLease.key == key, models.ScrapeLease.owner == owner)
+        .values(expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+async def release_lease(db: AsyncSession, key: str, owner: str):
+    await db.execute(
+        delete(models.ScrapeLease).filter(models.ScrapeLease.key == key, models.ScrapeLease.owner == owner)
+    )
+    await db.commit()
+
+async def get_lease(db: AsyncSession, key: str):
+    return await db.scalar(select(models.ScrapeLease).filter(models.ScrapeLease.key == key))
+
+# Chat history CRUD operations
+async def create_chat_messages(db: AsyncSession, session_id: str, messages: List[Tuple[str, str]]):
+    db.add_all([
+        models.ChatMessage(session_id=session_id, role=role, content=content)
+        for role, content in messages
+    ])
+    await db.commit()
+
+async def get_chat_messages(db: AsyncSession, session_id: str, after_id: int = 0):
+    return (await db.scalars(
+        select(models.ChatMessage)
+        .filter(models.ChatMessage.session_id == session_id, models.ChatMessage.id > after_id)
+        .order_by(models.ChatMessage.id)
+    )).all()
+
+async def get_chat_summary(db: AsyncSession, session_id: str):
+    return await db.scalar(select(models.ChatSummary).filter(models.ChatSummary.session_id == session_id))
+
+async def upsert_chat_summary(db: AsyncSession, session_id: str, summary: str, summarized_through: int):
+    db_summary = await get_chat_summary(db, session_id)
+    if db_summary is None:
+        db_summary = models.ChatSummary(session_id=session_id)
+        db.add(db_summary)
+    db_summary.summary = summary
+    db_summary.summarized_through = summarized_through
+    await db.commit()
+
+async def delete_chat_session(db: AsyncSession, session_id: str):
+    await db.execute(delete(models.ChatMessage).filter(models.ChatMessage.session_id == session_id))
+    await db.execute(delete(models.ChatSummary).filter(models.ChatSummary.session_id == session_id))
+    await db.commit()
+
+async def delete_chat_sessions_before(db: AsyncSession, before: datetime) -> int:
+    # A session expires when its most recent message is older than `before`
+    session_ids = (await db.scalars(
+        select(models.ChatMessage.session_id)
+        .group_by(models.ChatMessage.session_id)
+        .having(func.max(models.ChatMessage.created_at) < before)
+    )).all()
+    if session_ids:
+        await db.execute(delete(models.ChatMessage).filter(models.ChatMessage.session_id.in_(session_ids)))
+        await db.execute(delete(models.ChatSummary).filter(models.ChatSummary.session_id.in_(session_ids)))
+        await db.commit()
+    return len(session_ids)
@@ -0,0 +1,19 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .database import SQLITE_PRAGMAS, db_path
+
+SQLALCHEMY_ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{db_path}"
+
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL)
+
+# Objects stay usable after commit, async sessions cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
@@ -1,29 +1,57 @@
+from typing import Callable, List, Tuple
+
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from . import models, schemas
+from .snapshots import apply_snapshot
 
 # Video CRUD operations
 def get_video(db: Session, video_id: int):
     return db.query(models.Video).filter(models.Video.id == video_id).first()
 
-def get_videos(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.Video).offset(skip).limit(limit).all()
+def get_videos(db: Session, after_id: int = 0, limit: int = 10):
+    return db.query(models.Video).filter(models.Video.id > after_id).order_by(models.Video.id).limit(limit).all()
 
 def create_video(db: Session, video: schemas.VideoCreate):
     db_video = models.Video(url=video.url, title=video.title, summary=video.summary)
+    apply_snapshot(db_video)
     db.add(db_video)
     db.commit()
     db.refresh(db_video)
     return db_video
 
+# Called with the video id after its comments change, e.g. to drop cached chat context
+video_comment_listeners: List[Callable[[int], None]] = []
+
+def on_video_comments_changed(listener: Callable[[int], None]):
+    video_comment_listeners.append(listener)
+    return listener
+
+def _notify_video_comments_changed(video_id: int):
+    for listener in video_comment_listeners:
+        listener(video_id)
+
 # VideoComment CRUD operations
 def get_video_comment(db: Session, comment_id: int):
     return db.query(models.VideoComment).filter(models.VideoComment.id == comment_id).first()
 
-def get_video_comments(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.VideoComment).offset(skip).limit(limit).all()
+def get_video_comments(db: Session, after_id: int = 0, limit: int = 10):
+    return (
+        db.query(models.VideoComment)
+        .filter(models.VideoComment.id > after_id)
+        .order_by(models.VideoComment.id)
+        .limit(limit)
+        .all()
+    )
 
-def get_video_comments_by_video(db: Session, video_id: int, skip: int = 0, limit: int = 10):
-    return db.query(models.VideoComment).filter(models.VideoComment.video_id == video_id).offset(skip).limit(limit).all()
+def get_video_comments_by_video(db: Session, video_id: int, after_id: int = 0, limit: int = 10):
+    return (
+        db.query(models.VideoComment)
+        .filter(models.VideoComment.video_id == video_id, models.VideoComment.id > after_id)
+        .order_by(models.VideoComment.id)
+        .limit(limit)
+        .all()
+    )
 
 def create_video_comment(db: Session, video_comment: schemas.VideoCommentCreate):
     db_video_comment = models.VideoComment(
@@ -35,8 +63,18 @@ def create_video_comment(db: Session, video_comment: schemas.VideoCommentCreate)
         representative_comments=video_comment.representative_comments
     )
     db.add(db_video_comment)
+    # The stored snapshot no longer matches, it is rebuilt on the next read
+    db.query(models.Video).filter(models.Video.id == video_comment.video_id).update(
+        {
+            models.Video.content_version: func.coalesce(models.Video.content_version, 0) + 1,
+            models.Video.snapshot: None,
+            models.Video.etag: None
+        },
+        synchronize_session=False
+    )
     db.commit()
     db.refresh(db_video_comment)
+    _notify_video_comments_changed(video_comment.video_id)
     return db_video_comment
 
 def get_video_by_url(db: Session, url: str):
@@ -44,3 +82,47 @@ def get_video_by_url(db: Session, url: str):
 
 def get_comments_by_video_id(db: Session, video_id: int):
     return db.query(models.VideoComment).filter(models.VideoComment.video_id == video_id).all()
+
+# RawComment CRUD operations
+def get_top_raw_comments(db: Session, video_id: int, limit: int = 250):
+    return (
+        db.query(models.RawComment)
+        .filter(models.RawComment.video_id == video_id)
+        .order_by(models.RawComment.likes.desc(), models.RawComment.id)
+        .limit(limit)
+        .all()
+    )
+
+# Chat history CRUD operations
+def create_chat_messages(db: Session, session_id: str, messages: List[Tuple[str, str]]):
+    db.add_all([
+        models.ChatMessage(session_id=session_id, role=role, content=content)
+        for role, content in messages
+    ])
+    db.commit()
+
+def get_chat_messages(db: Session, session_id: str, after_id: int = 0):
+    return (
+        db.query(models.ChatMessage)
+        .filter(models.ChatMessage.session_id == session_id, models.ChatMessage.id > after_id)
+        .order_by(models.ChatMessage.id)
+        .all()
+    )
+
+def get_chat_summary(db: Session, session_id: str):
+    return db.query(models.ChatSummary).filter(models.ChatSummary.session_id == session_id).first()
+
+def upsert_chat_summary(db: Session, session_id: str, summary: str, summarized_through: int):
+    db_summary = get_chat_summary(db, session_id)
+    if db_summary is None:
+        db_summary = models.ChatSummary(session_id=session_id)
+        db.add(db_summary)
+    db_summary.summary = summary
+    db_summary.summarized_through = summarized_through
+    db.commit()
+
+def delete_chat_session(db: Session, session_id: str):
+    db.query(models.ChatMessage).filter(models.ChatMessage.session_id == session_id).delete()
+    db.query(models.ChatSummary).filter(models.ChatSummary.session_id == session_id).delete()
+    db.commit()
+
@@ -0,0 +1,52 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .database import Base
+from .search import REBUILD_DDL, SEARCH_DDL
+
+
+def add_missing_columns(engine: Engine):
+    """
+    `create_all` only creates missing tables, so columns added to existing
+    models are added here with ALTER TABLE, using their server default if any.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+
+
+def create_missing_indexes(engine: Engine):
+    """Indexes declared on models whose table predates them."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def create_search_index(engine: Engine):
+    """FTS5 tables and their sync triggers, backfilled from existing rows when first created."""
+    with engine.begin() as conn:
+        created = not inspect(conn).has_table("videos_fts")
+        for ddl in SEARCH_DDL:
+            conn.execute(text(ddl))
+        if created:
+            for ddl in REBUILD_DDL:
+                conn.execute(text(ddl))
+
+
+def run_migrations(engine: Engine):
+    """Bring an existing video.db up to date with the models."""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    create_search_index(engine)
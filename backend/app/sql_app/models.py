@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, DateTime, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -10,18 +12,80 @@ class Video(Base):
     url = Column(String, unique=True)
     title = Column(String)
     summary = Column(String)
+    content_version = Column(Integer, default=0, server_default="0")  # Bumped on every comment write
+    snapshot = Column(Text)  # Serialized /summarize result, cleared when comments change
+    etag = Column(String)  # Hash of snapshot
+    comments_watermark = Column(Integer, default=0, server_default="0")  # Newest comment create_time scraped
+    summarized_count = Column(Integer, default=0, server_default="0")  # Raw comments behind the last full summary
+    drift_count = Column(Integer, default=0, server_default="0")  # Raw comments merged in as deltas since then
+    refreshed_at = Column(DateTime)
 
     comments = relationship("VideoComment", back_populates="video")
+    raw_comments = relationship("RawComment", back_populates="video")
 
 class VideoComment(Base):
     __tablename__ = 'video_comments'
 
     id = Column(Integer, primary_key=True)
-    video_id = Column(Integer, ForeignKey('videos.id'))
+    video_id = Column(Integer, ForeignKey('videos.id'), index=True)
     comment_category = Column(String)
     summary = Column(String)
     category_count = Column(Integer)
     comment_insights = Column(String)  # Store as JSON string
     representative_comments = Column(String)  # Store as JSON string
 
-    video = relationship("Video", back_populates="comments")
\ No newline at end of file
+    video = relationship("Video", back_populates="comments")
+
+class RawComment(Base):
+    __tablename__ = 'raw_comments'
+    __table_args__ = (UniqueConstraint('video_id', 'cid'),)
+
+    id = Column(Integer, primary_key=True)
+    video_id = Column(Integer, ForeignKey('videos.id'), index=True)
+    cid = Column(String)  # TikTok comment id
+    title = Column(String)
+    text = Column(Text)
+    likes = Column(Integer)
+    create_time = Column(Integer)  # Unix time the comment was posted
+    summarized = Column(Boolean, default=False, server_default="0")  # Folded into the stored categories
+
+    video = relationship("Video", back_populates="raw_comments")
+
+class SummarizeJob(Base):
+    __tablename__ = 'summarize_jobs'
+
+    id = Column(String, primary_key=True)
+    status = Column(String, default="queued", index=True)  # queued, running, done or failed
+    stage = Column(String)  # Latest pipeline stage reached
+    urls = Column(String)  # Store as JSON string
+    top_k = Column(Integer)
+    progress = Column(String)  # Store as JSON string, stage of each URL
+    result = Column(String)  # Store as JSON string
+    error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ScrapeLease(Base):
+    __tablename__ = 'scrape_leases'
+
+    key = Column(String, primary_key=True)  # "summarize:<topK>:<url>", "refresh:<url>" or "job:<id>"
+    owner = Column(String)  # Worker holding the lease
+    expires_at = Column(DateTime, index=True)  # Renewed while the owner works, reclaimable after
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ChatMessage(Base):
+    __tablename__ = 'chat_messages'
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, index=True)
+    role = Column(String)  # human, ai or system
+    content = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ChatSummary(Base):
+    __tablename__ = 'chat_summaries'
+
+    session_id = Column(String, primary_key=True)
+    summary = Column(Text, default="")  # Running summary of compacted turns
+    summarized_through = Column(Integer, default=0)  # Last ChatMessage.id folded into the summary
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Opaque cursors for keyset pagination: the sort key of the last row of a page,
+so the next page is an index seek instead of an OFFSET scan.
+"""
+import base64
+import json
+from typing import Optional
+
+
+def encode_cursor(*key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    """The key inside `cursor`, None for no cursor. Raises ValueError if it is not a `size` key."""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError("Invalid cursor")
+    return key
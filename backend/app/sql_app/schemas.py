@@ -19,6 +19,20 @@ class VideoComment(VideoCommentBase):
     class Config:
         orm_mode: True
 
+class VideoCategoryCreate(BaseModel):
+    comment_category: Optional[str] = None
+    summary: Optional[str] = None
+    category_count: Optional[int] = None
+    comment_insights: Optional[str] = None  # JSON string
+    representative_comments: Optional[str] = None  # JSON string
+
+class RawCommentCreate(BaseModel):
+    cid: str
+    title: Optional[str] = None
+    text: str
+    likes: int = 0
+    create_time: int = 0
+
 class VideoBase(BaseModel):
     url: str
     title: Optional[str] = None
@@ -27,9 +41,18 @@ class VideoBase(BaseModel):
 class VideoCreate(VideoBase):
     pass
 
+class VideoWithCommentsCreate(VideoBase):
+    comments: List[VideoCategoryCreate] = []
+    raw_comments: List[RawCommentCreate] = []
+    comments_watermark: int = 0
+
 class Video(VideoBase):
     id: int
     comments: List[VideoComment] = []
 
     class Config:
         orm_mode: True
+
+class SummarizeJobCreate(BaseModel):
+    urls: List[str]
+    top_k: int = 250
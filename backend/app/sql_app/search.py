@@ -0,0 +1,116 @@
+"""
+FTS5 full-text index over video titles and category summaries and insights.
+
+Both FTS tables are external-content tables over `videos` and `video_comments`,
+kept in sync by triggers, so every writer (crud, async_crud, scripts or plain
+SQL) updates the index in the same transaction as the rows themselves.
+"""
+import re
+from typing import List
+
+from sqlalchemy import bindparam, text
+
+FTS_TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+SEARCH_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+        title, content='videos', content_rowid='id', tokenize='{FTS_TOKENIZER}'
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS video_comments_fts USING fts5(
+        comment_category, summary, comment_insights,
+        content='video_comments', content_rowid='id', tokenize='{FTS_TOKENIZER}'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_ai AFTER INSERT ON videos BEGIN
+        INSERT INTO videos_fts (rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_ad AFTER DELETE ON videos BEGIN
+        INSERT INTO videos_fts (videos_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    # Only on title changes, videos are also updated for every snapshot and refresh
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_au AFTER UPDATE OF title ON videos BEGIN
+        INSERT INTO videos_fts (videos_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO videos_fts (rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS video_comments_fts_ai AFTER INSERT ON video_comments BEGIN
+        INSERT INTO video_comments_fts (rowid, comment_category, summary, comment_insights)
+        VALUES (new.id, new.comment_category, new.summary, new.comment_insights);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS video_comments_fts_ad AFTER DELETE ON video_comments BEGIN
+        INSERT INTO video_comments_fts (video_comments_fts, rowid, comment_category, summary, comment_insights)
+        VALUES ('delete', old.id, old.comment_category, old.summary, old.comment_insights);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS video_comments_fts_au AFTER UPDATE ON video_comments BEGIN
+        INSERT INTO video_comments_fts (video_comments_fts, rowid, comment_category, summary, comment_insights)
+        VALUES ('delete', old.id, old.comment_category, old.summary, old.comment_insights);
+        INSERT INTO video_comments_fts (rowid, comment_category, summary, comment_insights)
+        VALUES (new.id, new.comment_category, new.summary, new.comment_insights);
+    END
+    """,
+]
+
+# Fills both indexes from the existing rows
+REBUILD_DDL = [
+    "INSERT INTO videos_fts (videos_fts) VALUES ('rebuild')",
+    "INSERT INTO video_comments_fts (video_comments_fts) VALUES ('rebuild')",
+]
+
+# A video's score is its best bm25 (lower is better) over its title and its
+# categories. Pages continue after the last (score, video_id) seen.
+SEARCH_SQL = text(
+    """
+    WITH matches AS (
+        SELECT rowid AS video_id, bm25(videos_fts) AS score
+        FROM videos_fts WHERE videos_fts MATCH :query
+        UNION ALL
+        SELECT c.video_id, bm25(video_comments_fts, 2.0, 1.0, 0.5) AS score
+        FROM video_comments_fts JOIN video_comments c ON c.id = video_comments_fts.rowid
+        WHERE video_comments_fts MATCH :query
+    ), ranked AS (
+        SELECT video_id, MIN(score) AS score FROM matches GROUP BY video_id
+    )
+    SELECT video_id, score FROM ranked
+    WHERE :after_score IS NULL OR score > :after_score OR (score = :after_score AND video_id > :after_id)
+    ORDER BY score, video_id
+    LIMIT :limit
+    """
+)
+
+SNIPPETS_SQL = text(
+    """
+    SELECT c.video_id, c.comment_category, snippet(video_comments_fts, -1, '[', ']', '...', 12)
+    FROM video_comments_fts JOIN video_comments c ON c.id = video_comments_fts.rowid
+    WHERE video_comments_fts MATCH :query AND c.video_id IN :video_ids
+    ORDER BY rank
+    """
+).bindparams(bindparam("video_ids", expanding=True))
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def match_query(query: str) -> str:
+    """
+    Free text as an FTS5 query: every word must match, the last one as a
+    prefix so results show up while typing. Words are quoted, so FTS5 syntax
+    in user input is never interpreted. Empty if `query` has no words.
+    """
+    words = WORD_RE.findall(query)
+    if not words:
+        return ""
+    terms: List[str] = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
@@ -0,0 +1,43 @@
+"""
+Ready-to-send JSON for a stored video, written alongside the video so cache
+hits on /summarize skip the ORM and the JSON round trip entirely.
+"""
+import hashlib
+import json
+from typing import Tuple
+
+from . import models
+
+
+def serialize_video(video: models.Video) -> dict:
+    categories = {}
+    for comment in video.comments:
+        categories[comment.comment_category] = {
+            "summary": comment.summary,
+            "categoryCount": comment.category_count,
+            "commentInsights": json.loads(comment.comment_insights),
+            "representativeComments": json.loads(comment.representative_comments)
+        }
+    return {
+        "video_summary": video.summary,
+        "title": video.title,
+        "categories": categories
+    }
+
+
+def encode(content) -> str:
+    # Same encoding as JSONResponse so snapshots and freshly built results are identical
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def make_etag(*parts: str) -> str:
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def build_snapshot(video: models.Video) -> Tuple[str, str]:
+    snapshot = encode(serialize_video(video))
+    return snapshot, make_etag(snapshot)
+
+
+def apply_snapshot(video: models.Video):
+    video.snapshot, video.etag = build_snapshot(video)
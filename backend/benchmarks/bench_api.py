@@ -0,0 +1,169 @@
+"""
+End-to-end API benchmark, fully offline.
+
+The app runs in-process against a fresh SQLite database, a local TikTok
+stand-in (fake_tiktok) and a fake chat model with fixed latency (fake_llm).
+Scenarios drive /summarize, /chat and /videos and report throughput,
+p50/p95/p99 latency and peak RSS.
+
+    cd backend
+    python -m benchmarks.bench_api --videos 20 --requests 200 --concurrency 10 --output bench_api.json
+
+Scenarios:
+    summarize_cold    every video once: scrape, summarize, store
+    summarize_cached  random videos again, served from stored snapshots
+    chat              /chat on random videos
+    videos            /videos/ listing and /videos/by_url/ lookups
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+
+SCENARIOS = ["summarize_cold", "summarize_cached", "chat", "videos", "search"]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_scenario(name: str, count: int, concurrency: int, request: Callable[[int], Awaitable[httpx.Response]]) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with slots:
+            started = time.perf_counter()
+            try:
+                response = await request(i)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception as e:
+                print(f"{name}: {type(e).__name__}: {e}")
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(count)])
+    duration = time.perf_counter() - started
+
+    return {
+        "requests": count,
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": duration,
+        "throughput_rps": count / duration if duration else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run(args) -> dict:
+    from app.main import app
+    from app.ai_models import model_registry
+    from app.ai_models.commentSummarizer.commentSummary import CommentSummary
+    from app.agents.video_feedback_agent import VideoFeedbackAgent
+    from app.sql_app.pagination import encode_cursor
+
+    from .fake_llm import FakeChatModel
+
+    model = FakeChatModel(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second)
+    model_registry.override("comment_summary", CommentSummary(model=model))
+    model_registry.override("feedback_agent", VideoFeedbackAgent(model=model))
+
+    rng = random.Random(args.seed)
+    urls = [f"https://www.tiktok.com/@bench/video/{7000000000000000000 + i}" for i in range(args.videos)]
+
+    scenarios = {
+        "summarize_cold": (len(urls), lambda client, i: client.post("/summarize/", json={"URLS": [urls[i]], "topK": args.top_k})),
+        "summarize_cached": (args.requests, lambda client, i: client.post("/summarize/", json={"URLS": [rng.choice(urls)]})),
+        "chat": (args.requests, lambda client, i: client.post("/chat", json={"url": rng.choice(urls), "user_input": "What did viewers like most?"})),
+        "videos": (args.requests, lambda client, i: (
+            client.get("/videos/", params={"cursor": encode_cursor(rng.randrange(len(urls))), "limit": 10}) if i % 2
+            else client.get("/videos/by_url/", params={"video_url": rng.choice(urls)})
+        )),
+        "search": (args.requests, lambda client, i: client.get("/search", params={"q": rng.choice(["humor", "praise", "quest"])})),
+    }
+
+    report = {"config": vars(args), "scenarios": {}}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in args.scenarios:
+                count, request = scenarios[name]
+                result = await run_scenario(name, count, args.concurrency, lambda i: request(client, i))
+                report["scenarios"][name] = result
+                print(f"{name}: {result['throughput_rps']:.1f} req/s, p50 {result['p50_ms']:.1f} ms, "
+                      f"p99 {result['p99_ms']:.1f} ms, {result['errors']} errors")
+    report["llm_calls"] = model.calls
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario, except summarize_cold")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=250)
+    parser.add_argument("--comments", type=int, default=1000, help="Comments per fake video")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--tiktok-latency", type=float, default=0.02)
+    parser.add_argument("--tiktok-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Fresh databases, no network and no real API keys. The app reads these at
+        # import time, so nothing importing `app` may be imported before this point.
+        os.environ.update({
+            "VIDEO_DB_PATH": os.path.join(workdir, "video.db"),
+            "SUMMARY_CACHE_PATH": os.path.join(workdir, "summary_cache.db"),
+            "EMBEDDING_INDEX_DIR": os.path.join(workdir, "embeddings"),
+            "LLM_WARMUP": "0",
+        })
+        os.environ.setdefault("GOOGLE_API_KEY", "offline")
+        os.environ.setdefault("GROQ_API_KEY", "offline")
+
+        from .fake_tiktok import FakeTikTokServer, create_fake_tiktok
+
+        fake_tiktok = create_fake_tiktok(args.comments, args.page_size, args.tiktok_latency, args.tiktok_error_rate, args.seed)
+        with FakeTikTokServer(fake_tiktok) as server:
+            os.environ["TIKTOK_COMMENT_API"] = server.comment_api
+            report = asyncio.run(run(args))
+            report["tiktok_requests"] = fake_tiktok.state.requests
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Near-duplicate collapsing benchmark on a synthetic TikTok-like comment corpus.
+
+Reports prompt token reduction and throughput of collapse_near_duplicates.
+
+    cd backend
+    python -m benchmarks.bench_dedup --comments 100000 --output bench_dedup.json
+"""
+import argparse
+import json
+import random
+import time
+
+from app.ai_models.commentDeduplicator import collapse_near_duplicates
+from app.ai_models.tokenizer import count_tokens
+
+EMOJIS = ["😂", "😭", "💀", "🔥", "❤️", "👏", "😍", "🤣"]
+FIRSTS = ["first", "First!", "FIRST", "first!!!", "firsttt", "early", "who's here in 2024"]
+JOKES = [
+    "this is the funniest thing i have seen all week",
+    "why does this have so few views, underrated",
+    "the way he looked at the camera at the end",
+    "pov: you came here from the other video",
+    "my mom walked in right at the worst part",
+    "i watched this 10 times and still laughing",
+    "not the cat judging everyone in the background",
+    "who else is watching this at 3am",
+    "the editing on this is actually insane",
+    "bro really said that with a straight face",
+]
+WORDS = (
+    "video song dance trend edit camera light sound voice outfit recipe tutorial "
+    "question love hate funny weird great amazing boring part minute ending start "
+    "music beat vibe color style makeup hair room dog cat friend family school work"
+).split()
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    text = list(text)
+    for _ in range(rng.randint(0, 2)):
+        position = rng.randrange(len(text))
+        choice = rng.random()
+        if choice < 0.4:
+            text.insert(position, rng.choice("!?. "))
+        elif choice < 0.7 and len(text) > 1:
+            del text[position]
+        else:
+            text[position] = text[position].upper()
+    return "".join(text)
+
+
+def synthetic_comments(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.3:
+            text = "".join(rng.choice(EMOJIS[:3]) * rng.randint(1, 6) for _ in range(rng.randint(1, 2)))
+        elif roll < 0.4:
+            text = rng.choice(FIRSTS)
+        elif roll < 0.65:
+            text = mutate(rng.choice(JOKES), rng)
+        else:
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 14)))
+        comments.append({"text": text, "likes": int(rng.paretovariate(1.2)) - 1})
+    return comments
+
+
+def run(count: int, threshold: float, num_perm: int, bands: int) -> dict:
+    comments = synthetic_comments(count)
+
+    start = time.perf_counter()
+    collapsed = collapse_near_duplicates(comments, threshold=threshold, num_perm=num_perm, bands=bands)
+    elapsed = time.perf_counter() - start
+
+    tokens_before = count_tokens(comments)
+    tokens_after = count_tokens(collapsed)
+    return {
+        "comments": count,
+        "collapsed_comments": len(collapsed),
+        "multiplicity_preserved": sum(comment.get("count", 1) for comment in collapsed) == count,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "token_reduction": 1 - tokens_after / tokens_before,
+        "seconds": elapsed,
+        "comments_per_second": count / elapsed,
+        "threshold": threshold,
+        "num_perm": num_perm,
+        "bands": bands,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comments", type=int, default=100_000)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--num-perm", type=int, default=64)
+    parser.add_argument("--bands", type=int, default=16)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run(args.comments, args.threshold, args.num_perm, args.bands)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
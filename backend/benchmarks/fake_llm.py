@@ -0,0 +1,71 @@
+"""
+Chat model stand-in with configurable latency, for CommentSummary and VideoFeedbackAgent.
+
+Prompts asking for comment categories get a JSON answer built from the
+comments in the prompt, every other prompt gets a fixed reply.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+REPLY = (
+    "Viewers mostly enjoyed the pacing and the ending. The most common request is "
+    "a follow-up video, and a few comments point out that the audio is too quiet."
+)
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.5  # Seconds before the first token
+    tokens_per_second: float = 0.0  # Streaming speed after that, 0 sends the reply at once
+    model_name: str = "fake-chat"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "categoryCount" not in prompt:
+            return REPLY
+        # One packed "[likes] text" line per comment
+        comments = max(len(re.findall(r"^\[\d+", prompt, re.MULTILINE)), 1)
+        categories = {
+            name: {
+                "summary": f"Comments about {name.lower()}",
+                "categoryCount": max(comments * share // 100, 1),
+                "commentInsights": [f"{name} comes up often", f"{name} drives engagement"],
+                "representativeComments": [f"example {name.lower()} comment"],
+            }
+            for name, share in (("Humor", 40), ("Praise", 35), ("Questions", 25))
+        }
+        return json.dumps({"categories": categories})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _astream(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for word in self._reply(messages).split(" "):
+            if self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,120 @@
+"""
+Local stand-in for TikTok's /api/comment/list/ endpoint.
+
+Comments are generated deterministically per aweme_id from the synthetic corpus
+in bench_dedup. Page size, latency, error rate and comment volume are
+configurable so scrape behaviour can be measured without network access.
+
+    cd backend
+    python -m benchmarks.fake_tiktok --port 8001 --comments 2000 --latency 0.05
+    TIKTOK_COMMENT_API=http://127.0.0.1:8001/api/comment/list/ uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+import uvicorn
+from fastapi import FastAPI, Response
+
+from .bench_dedup import synthetic_comments
+
+
+def create_fake_tiktok(
+    comments_per_video: int = 1000,
+    page_size: int = 50,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = 7,
+) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.requests = 0
+    app.state.errors = 0
+
+    @lru_cache(maxsize=1024)
+    def video_comments(aweme_id: str) -> list:
+        video_seed = zlib.crc32(aweme_id.encode())
+        now = int(time.time())
+        comments = [
+            {
+                "cid": f"{aweme_id}-{i}",
+                "text": comment["text"],
+                "digg_count": comment["likes"],
+                "create_time": now - i * 60,
+                "comment_language": "en",
+                "share_info": {"title": f"Video {aweme_id}"},
+            }
+            for i, comment in enumerate(synthetic_comments(comments_per_video, seed=video_seed))
+        ]
+        # TikTok lists the most liked comments first
+        comments.sort(key=lambda comment: comment["digg_count"], reverse=True)
+        return comments
+
+    @app.get("/api/comment/list/")
+    async def comment_list(aweme_id: str, count: int = 20, cursor: int = 0):
+        app.state.requests += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if error_rate and rng.random() < error_rate:
+            app.state.errors += 1
+            if rng.random() < 0.5:
+                return Response(status_code=429, headers={"Retry-After": "0"})
+            return Response(status_code=503)
+
+        comments = video_comments(aweme_id)
+        count = min(count, page_size)
+        page = comments[cursor:cursor + count]
+        return {
+            "comments": page,
+            "cursor": cursor + len(page),
+            "has_more": int(cursor + count < len(comments)),
+            "total": len(comments),
+        }
+
+    return app
+
+
+class FakeTikTokServer:
+    """Serves a fake TikTok app with uvicorn on a background thread, on a free port."""
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 0):
+        self.app = app
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def comment_api(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/api/comment/list/"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--comments", type=int, default=1000, help="Comments per video")
+    parser.add_argument("--page-size", type=int, default=50, help="Largest page returned, whatever count is asked for")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429 or 503")
+    args = parser.parse_args()
+
+    app = create_fake_tiktok(args.comments, args.page_size, args.latency, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+import pytest
+
+# The app creates its databases at import time, so they are pointed at a scratch
+# directory before any test imports `app`
+_workdir = tempfile.mkdtemp(prefix="tiktok-tests-")
+os.environ.setdefault("VIDEO_DB_PATH", os.path.join(_workdir, "video.db"))
+os.environ.setdefault("SUMMARY_CACHE_PATH", os.path.join(_workdir, "summary_cache.db"))
+os.environ.setdefault("EMBEDDING_INDEX_DIR", os.path.join(_workdir, "embeddings"))
+os.environ.setdefault("LLM_WARMUP", "0")
+os.environ.setdefault("GOOGLE_API_KEY", "offline")
+os.environ.setdefault("GROQ_API_KEY", "offline")
+
+
+@pytest.fixture
+def anyio_backend():
+    # The pipeline is built on asyncio primitives, async tests only run there
+    return "asyncio"
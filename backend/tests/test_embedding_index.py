@@ -0,0 +1,81 @@
+import sqlite3
+
+from app.ai_models.embeddingIndex import EmbeddingIndex
+
+
+def texts(index, video_id, query="anything"):
+    return sorted(text for _, _, _, text in index.search(video_id, query))
+
+
+def test_search_ranks_the_closest_item_first(tmp_path):
+    index = EmbeddingIndex(str(tmp_path))
+    index.sync_video(1, 1, [
+        ("category", 1, "Viewers love the guitar solo"),
+        ("category", 2, "Complaints about the lighting"),
+        ("comment", 3, "what camera is this"),
+    ])
+
+    (score, kind, source_id, text), *_ = index.search(1, "guitar solo")
+    assert (kind, source_id) == ("category", 1)
+    assert index.version(1) == 1
+
+
+def test_resync_only_embeds_new_items_and_deactivates_dropped_ones(tmp_path):
+    index = EmbeddingIndex(str(tmp_path))
+    index.sync_video(1, 1, [("category", 1, "one"), ("category", 2, "two")])
+    index.sync_video(1, 2, [("category", 2, "two"), ("category", 3, "three")])
+
+    assert texts(index, 1) == ["three", "two"]
+    assert index.indexed == 3
+    # A dropped item coming back is revived without embedding it again
+    index.sync_video(1, 3, [("category", 1, "one")])
+    assert texts(index, 1) == ["one"]
+    assert index.indexed == 3
+
+
+def test_same_source_id_under_two_videos(tmp_path):
+    index = EmbeddingIndex(str(tmp_path))
+    index.sync_video(1, 1, [("category", 6, "funny cats")])
+    index.sync_video(1, 2, [("category", 4, "sad dogs")])
+    # Category ids are reused once video 1's categories were replaced
+    index.sync_video(2, 1, [("category", 6, "cooking pasta")])
+
+    assert texts(index, 1) == ["sad dogs"]
+    assert texts(index, 2) == ["cooking pasta"]
+
+
+def test_changed_text_under_the_same_id_is_embedded_again(tmp_path):
+    index = EmbeddingIndex(str(tmp_path))
+    index.sync_video(1, 1, [("category", 1, "pasta recipe")])
+    index.sync_video(1, 2, [("category", 1, "guitar lesson")])
+
+    assert texts(index, 1) == ["guitar lesson"]
+    (score, *_), = index.search(1, "guitar lesson")
+    assert score > 0.99
+
+
+def test_index_survives_reopening(tmp_path):
+    EmbeddingIndex(str(tmp_path)).sync_video(1, 5, [("comment", 1, "great video")])
+
+    reopened = EmbeddingIndex(str(tmp_path))
+    assert reopened.version(1) == 5
+    assert texts(reopened, 1) == ["great video"]
+
+
+def test_index_keyed_per_source_only_is_rebuilt(tmp_path):
+    with sqlite3.connect(tmp_path / "index.db") as conn:
+        conn.execute(
+            """
+            CREATE TABLE items (
+                row INTEGER PRIMARY KEY, video_id INTEGER NOT NULL, kind TEXT NOT NULL,
+                source_id INTEGER NOT NULL, text TEXT NOT NULL, active INTEGER NOT NULL DEFAULT 1,
+                UNIQUE (kind, source_id)
+            )
+            """
+        )
+        conn.execute("INSERT INTO items (row, video_id, kind, source_id, text) VALUES (0, 1, 'category', 6, 'old')")
+
+    index = EmbeddingIndex(str(tmp_path))
+    assert index.stats()["active_items"] == 0
+    index.sync_video(2, 1, [("category", 6, "new")])
+    assert texts(index, 2) == ["new"]
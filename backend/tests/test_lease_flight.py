@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.pipeline import LeaseFlight
+from app.sql_app import async_crud, models
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    # A database of its own, shared by the "workers" of one test like video.db is
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'leases.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+def worker(session_factory, owner, ttl=1.0):
+    return LeaseFlight(session_factory, ttl=ttl, poll_interval=0.02, owner=owner)
+
+
+async def test_second_worker_reads_the_stored_result(session_factory):
+    a, b = worker(session_factory, "a"), worker(session_factory, "b")
+    store = {}
+    runs = []
+
+    def job(owner):
+        async def run():
+            runs.append(owner)
+            await asyncio.sleep(0.1)
+            store["key"] = owner
+            return owner
+        return run
+
+    async def stored():
+        return store.get("key")
+
+    first = asyncio.create_task(a.do("key", job("a"), stored))
+    await asyncio.sleep(0.02)
+    second = await b.do("key", job("b"), stored)
+
+    assert (await first, second) == ("a", "a")
+    assert runs == ["a"]
+    assert (b.waited, b.shared) == (1, 1)
+    async with session_factory() as db:
+        assert await async_crud.get_lease(db, "key") is None
+
+
+async def test_expired_lease_of_a_crashed_worker_is_taken_over(session_factory):
+    async with session_factory() as db:
+        assert await async_crud.acquire_lease(db, "key", "crashed", 0.2)
+
+    flight = worker(session_factory, "b")
+    started = time.monotonic()
+
+    async def nothing():
+        return None
+
+    async def job():
+        return "b"
+
+    assert await flight.do("key", job, nothing) == "b"
+    assert time.monotonic() - started >= 0.15
+
+
+async def test_lease_is_renewed_while_the_job_runs(session_factory):
+    a, b = worker(session_factory, "a", ttl=0.3), worker(session_factory, "b", ttl=0.3)
+
+    async with a.hold("key") as acquired:
+        assert acquired
+        # Well past the ttl, the heartbeat keeps the claim alive
+        await asyncio.sleep(0.8)
+        assert await b.held("key")
+        async with b.hold("key") as stolen:
+            assert not stolen
+
+    assert a.lost == 0
+    assert not await b.held("key")
+
+
+async def test_waiter_takes_over_when_the_holder_fails(session_factory):
+    a, b = worker(session_factory, "a"), worker(session_factory, "b")
+
+    async def nothing():
+        return None
+
+    async def failing():
+        await asyncio.sleep(0.1)
+        raise RuntimeError("LLM call failed")
+
+    async def job():
+        return "b"
+
+    first = asyncio.create_task(a.do("key", failing, nothing))
+    await asyncio.sleep(0.02)
+
+    assert await b.do("key", job, nothing) == "b"
+    with pytest.raises(RuntimeError):
+        await first
+    assert (b.waited, b.acquired) == (1, 1)
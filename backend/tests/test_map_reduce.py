@@ -0,0 +1,59 @@
+from app.ai_models.commentSummarizer.mapReduce import chunk_comments, merge_comment_categories
+
+
+def category(summary, count, insights=(), representative=()):
+    return {
+        "summary": summary,
+        "categoryCount": count,
+        "commentInsights": list(insights),
+        "representativeComments": list(representative),
+    }
+
+
+def test_chunks_stay_within_budget_and_keep_order():
+    comments = ["a", "bb", "ccc", "dddd", "e"]
+    chunks = chunk_comments(comments, 5, cost=len)
+
+    assert [c for chunk in chunks for c in chunk] == comments
+    assert all(sum(map(len, chunk)) <= 5 for chunk in chunks)
+
+
+def test_oversized_comment_gets_its_own_chunk():
+    assert chunk_comments(["a", "toolong", "b"], 3, cost=len) == [["a"], ["toolong"], ["b"]]
+
+
+def test_merge_matches_names_case_insensitively_and_sums_counts():
+    merged = merge_comment_categories([
+        {"categories": {"Praise": category("small", 2)}},
+        {"categories": {" praise ": category("large", 5)}},
+    ])
+
+    assert list(merged["categories"]) == ["Praise"]
+    praise = merged["categories"]["Praise"]
+    assert praise["categoryCount"] == 7
+    # The summary of the chunk where the category was largest
+    assert praise["summary"] == "large"
+
+
+def test_merge_dedupes_and_caps_insights():
+    merged = merge_comment_categories(
+        [
+            {"categories": {"Humor": category("a", 1, ["Funny", "Loud"], ["lol"])}},
+            {"categories": {"Humor": category("b", 1, ["funny ", "Quick"], ["lol", "haha"])}},
+        ],
+        max_insights=2,
+    )
+
+    humor = merged["categories"]["Humor"]
+    assert humor["commentInsights"] == ["Funny", "Loud"]
+    assert humor["representativeComments"] == ["lol", "haha"]
+
+
+def test_merge_orders_by_count_and_skips_empty_results():
+    merged = merge_comment_categories([
+        None,
+        {"categories": {"Questions": category("q", 1), "Praise": category("p", 4)}},
+        {},
+    ])
+
+    assert list(merged["categories"]) == ["Praise", "Questions"]
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.pipeline import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_callers_share_one_run():
+    flights = SingleFlight()
+    runs = 0
+
+    async def job():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        return runs
+
+    results = await asyncio.gather(*[flights.do("url", job) for _ in range(3)])
+
+    assert results == [1, 1, 1]
+    assert (flights.started, flights.shared) == (1, 2)
+    # Forgotten once done, the next call starts a new run
+    assert "url" not in flights
+    assert await flights.do("url", job) == 2
+
+
+async def test_different_keys_run_separately():
+    flights = SingleFlight()
+
+    async def job(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    assert await asyncio.gather(flights.do("a", lambda: job("a")), flights.do("b", lambda: job("b"))) == ["a", "b"]
+    assert flights.started == 2
+
+
+async def test_failure_reaches_every_caller_and_is_not_cached():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("scrape failed")
+
+    results = await asyncio.gather(flights.do("url", failing), flights.do("url", failing), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flights) == 0
+
+
+async def test_cancelled_caller_does_not_cancel_the_job():
+    flights = SingleFlight()
+    finished = asyncio.Event()
+
+    async def job():
+        await asyncio.sleep(0.05)
+        finished.set()
+        return "done"
+
+    leaving = asyncio.create_task(flights.do("url", job))
+    staying = asyncio.create_task(flights.do("url", job))
+    await asyncio.sleep(0.01)
+    leaving.cancel()
+
+    assert await staying == "done"
+    assert finished.is_set()
+    with pytest.raises(asyncio.CancelledError):
+        await leaving
@@ -0,0 +1,48 @@
+import pytest
+
+from app.scraper.top_k import TopKComments
+
+
+def comment(text, likes):
+    return {"text": text, "likes": likes}
+
+
+def test_keeps_the_k_most_liked():
+    top = TopKComments(3)
+    for i, likes in enumerate([5, 1, 9, 3, 7, 2]):
+        top.push(comment(f"c{i}", likes))
+
+    assert [c["likes"] for c in top.sorted()] == [9, 7, 5]
+    assert len(top) == 3
+    assert top.seen == 6
+
+
+def test_threshold_only_once_full():
+    top = TopKComments(2)
+    assert top.threshold is None
+    top.push(comment("a", 4))
+    assert top.threshold is None
+    top.push(comment("b", 8))
+    assert top.full
+    assert top.threshold == 4
+
+
+def test_push_reports_whether_the_comment_made_it():
+    top = TopKComments(1)
+    assert top.push(comment("a", 3))
+    assert not top.push(comment("b", 1))
+    assert top.push(comment("c", 5))
+    assert top.sorted() == [comment("c", 5)]
+
+
+def test_ties_keep_the_earliest_comment():
+    top = TopKComments(2)
+    for text in ["first", "second", "third"]:
+        top.push(comment(text, 1))
+
+    assert [c["text"] for c in top.sorted()] == ["first", "second"]
+
+
+def test_k_must_be_positive():
+    with pytest.raises(ValueError):
+        TopKComments(0)